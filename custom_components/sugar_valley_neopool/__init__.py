@@ -56,7 +56,7 @@ _LOGGER = logging.getLogger(__name__)
 CONFIG_ENTRY_VERSION = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class NeoPoolData:
     """Runtime data for the NeoPool integration."""
 
@@ -125,21 +125,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: NeoPoolConfigEntry) -> b
     # Apply entity_id_mapping to preserve original YAML entity IDs
     if entity_id_mapping:
         # Log what entities exist for this integration before renaming
-        entity_registry = er.async_get(hass)
-        integration_entities = [
-            e for e in entity_registry.entities.values() if e.platform == DOMAIN
-        ]
-        _LOGGER.debug(
-            "Found %d entities for platform '%s' before applying mapping",
-            len(integration_entities),
-            DOMAIN,
-        )
-        for e in integration_entities[:10]:  # Log first 10
-            _LOGGER.debug("  - %s (unique_id=%s)", e.entity_id, e.unique_id)
-        if len(integration_entities) > 10:
-            _LOGGER.debug("  ... and %d more", len(integration_entities) - 10)
+        # Guarded because it scans the whole entity registry just for debug output
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            entity_registry = er.async_get(hass)
+            integration_entities = [
+                e for e in entity_registry.entities.values() if e.platform == DOMAIN
+            ]
+            _LOGGER.debug(
+                "Found %d entities for platform '%s' before applying mapping",
+                len(integration_entities),
+                DOMAIN,
+            )
+            for e in integration_entities[:10]:  # Log first 10
+                _LOGGER.debug("  - %s (unique_id=%s)", e.entity_id, e.unique_id)
+            if len(integration_entities) > 10:
+                _LOGGER.debug("  ... and %d more", len(integration_entities) - 10)
 
-        await _apply_entity_id_mapping(hass, entry, entity_id_mapping)
+        _apply_entity_id_mapping(hass, entry, entity_id_mapping)
 
         # Clean up orphaned YAML entities that can't be migrated (e.g., binary sensors
         # replaced by switches). This runs only when entity_id_mapping exists (YAML migration).
@@ -213,7 +215,8 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     return True
 
 
-async def _apply_entity_id_mapping(
+@callback
+def _apply_entity_id_mapping(
     hass: HomeAssistant,
     entry: NeoPoolConfigEntry,
     entity_id_mapping: dict[str, str],
@@ -234,6 +237,9 @@ async def _apply_entity_id_mapping(
         entry: Config entry
         entity_id_mapping: Dict mapping entity_key -> original entity_id or object_id
     """
+    if not entity_id_mapping:
+        return
+
     entity_registry = er.async_get(hass)
     nodeid = entry.runtime_data.nodeid
     updated_count = 0
@@ -251,20 +257,28 @@ async def _apply_entity_id_mapping(
     # These are YAML entities replaced by different entity types in the integration
     keys_to_skip = {entity_key for _, entity_key in YAML_ENTITIES_TO_DELETE}
 
+    # Index this entry's entities once (unique_id -> domain -> entity_id) so each
+    # mapping key resolves with dict hits instead of per-domain registry lookups
+    entity_ids_by_unique_id: dict[str, dict[str, str]] = {}
+    for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id):
+        entity_ids_by_unique_id.setdefault(entity.unique_id, {})[entity.domain] = entity.entity_id
+
     for yaml_entity_key, target_value in entity_id_mapping.items():
         # Skip entities that are marked for deletion (replaced by different entity types)
         if yaml_entity_key in keys_to_skip:
             continue
         # Determine if target_value is full entity_id or just object_id
         # Full entity_id format: "domain.object_id" (contains a dot)
+        target_domain: str | None
         if "." in target_value:
             # New format: full entity_id with domain
-            target_domain, target_object_id = target_value.split(".", 1)
+            target_domain, _, target_object_id = target_value.partition(".")
             target_entity_id = target_value
             # Search in specific domain first, then others as fallback
             domains_to_search = [target_domain] + [d for d in all_domains if d != target_domain]
         else:
             # Old format: just object_id (backwards compatibility)
+            target_domain = None  # Taken from the found entity
             target_object_id = target_value
             target_entity_id = None  # Will be determined after finding entity
             domains_to_search = all_domains
@@ -283,12 +297,15 @@ async def _apply_entity_id_mapping(
         unique_id = f"neopool_mqtt_{nodeid}_{integration_key}"
 
         # Search for entity in domains (prioritizing target domain if known)
-        current_entity_id = None
-        for domain in domains_to_search:
-            entity_id = entity_registry.async_get_entity_id(domain, DOMAIN, unique_id)
-            if entity_id:
-                current_entity_id = entity_id
-                break
+        entity_ids_by_domain = entity_ids_by_unique_id.get(unique_id, {})
+        current_entity_id = next(
+            (
+                entity_ids_by_domain[domain]
+                for domain in domains_to_search
+                if domain in entity_ids_by_domain
+            ),
+            None,
+        )
 
         if current_entity_id is None:
             _LOGGER.debug(
@@ -299,22 +316,18 @@ async def _apply_entity_id_mapping(
             )
             continue
 
-        # For old format, build target_entity_id from found entity's domain
+        current_domain = current_entity_id.partition(".")[0]
         if target_entity_id is None:
-            current_domain = current_entity_id.split(".", 1)[0]
+            # For old format, build target_entity_id from found entity's domain
             target_entity_id = f"{current_domain}.{target_object_id}"
-        else:
-            current_domain = current_entity_id.split(".", 1)[0]
-
-        # Check if domains match - HA doesn't allow cross-domain entity renames
-        target_domain_check = target_entity_id.split(".", 1)[0]
-        if current_domain != target_domain_check:
+        elif current_domain != target_domain:
+            # Domains must match - HA doesn't allow cross-domain entity renames
             _LOGGER.debug(
                 "Skipping cross-domain mapping: %s -> %s (domains don't match: %s != %s)",
                 current_entity_id,
                 target_entity_id,
                 current_domain,
-                target_domain_check,
+                target_domain,
             )
             continue
 
@@ -342,6 +355,8 @@ async def _apply_entity_id_mapping(
             current_entity_id,
             new_entity_id=target_entity_id,
         )
+        # Keep the index current in case another YAML key maps to the same entity
+        entity_ids_by_domain[current_domain] = target_entity_id
         updated_count += 1
         _LOGGER.info(
             "Renamed entity %s -> %s to preserve YAML entity_id",
@@ -522,11 +537,7 @@ async def async_migrate_masked_unique_ids(
     )
 
     # Step 1: Find entities with masked unique_ids for this config entry
-    all_entry_entities = [
-        entity
-        for entity in entity_registry.entities.values()
-        if entity.config_entry_id == entry.entry_id
-    ]
+    all_entry_entities = er.async_entries_for_config_entry(entity_registry, entry.entry_id)
     _LOGGER.debug(
         "Found %d total entities for config entry %s",
         len(all_entry_entities),
@@ -596,6 +607,7 @@ async def async_migrate_masked_unique_ids(
     # Step 4: Update entity unique_ids
     _LOGGER.debug("Starting entity unique_id migration for %d entities", len(masked_entities))
     migrated_count = 0
+    real_prefix = f"neopool_mqtt_{real_nodeid}_"
     for entity in masked_entities:
         entity_key = extract_entity_key_from_masked_unique_id(entity.unique_id)
         _LOGGER.debug(
@@ -610,7 +622,7 @@ async def async_migrate_masked_unique_ids(
             )
             continue
 
-        new_unique_id = f"neopool_mqtt_{real_nodeid}_{entity_key}"
+        new_unique_id = real_prefix + entity_key
         _LOGGER.debug(
             "Entity %s: old unique_id='%s' -> new unique_id='%s'",
             entity.entity_id,
@@ -660,20 +672,21 @@ async def async_migrate_masked_unique_ids(
             real_nodeid,
         )
 
-    # Step 6: Update device registry identifier
-    device_registry = dr.async_get(hass)
-    old_device = device_registry.async_get_device(identifiers={(DOMAIN, current_nodeid)})
-    if old_device and current_nodeid != real_nodeid:
-        # Update device identifiers to use real NodeID
-        device_registry.async_update_device(
-            old_device.id,
-            new_identifiers={(DOMAIN, real_nodeid)},
-        )
-        _LOGGER.info(
-            "Updated device identifier: %s -> %s",
-            current_nodeid,
-            real_nodeid,
-        )
+    # Step 6: Update device registry identifier (only needed if the NodeID changed)
+    if current_nodeid != real_nodeid:
+        device_registry = dr.async_get(hass)
+        old_device = device_registry.async_get_device(identifiers={(DOMAIN, current_nodeid)})
+        if old_device:
+            # Update device identifiers to use real NodeID
+            device_registry.async_update_device(
+                old_device.id,
+                new_identifiers={(DOMAIN, real_nodeid)},
+            )
+            _LOGGER.info(
+                "Updated device identifier: %s -> %s",
+                current_nodeid,
+                real_nodeid,
+            )
 
     _LOGGER.info(
         "Migration complete: %d/%d entities migrated to use NodeID %s",
@@ -839,10 +852,18 @@ async def _wait_for_real_nodeid(
     def message_received(msg: mqtt.ReceiveMessage) -> None:
         """Handle telemetry message and extract NodeID."""
         nonlocal real_nodeid
+        if event.is_set():
+            # NodeID already captured; ignore messages queued before unsubscribe
+            return
         try:
             if isinstance(msg.payload, (bytes, bytearray)):
+                # Substring test skips telemetry without a NodeID before decoding
+                if b'"NodeID"' not in msg.payload:
+                    return
                 payload_str = msg.payload.decode("utf-8")
             else:
+                if '"NodeID"' not in msg.payload:
+                    return
                 payload_str = msg.payload
 
             payload = json.loads(payload_str)
@@ -855,9 +876,11 @@ async def _wait_for_real_nodeid(
         except (json.JSONDecodeError, UnicodeDecodeError) as err:
             _LOGGER.debug("Failed to parse telemetry payload: %s", err)
 
-    # Subscribe to sensor topic
+    # Subscribe to sensor topic; raw bytes let the NodeID check run before decoding
     sensor_topic = f"tele/{mqtt_topic}/SENSOR"
-    unsubscribe = await mqtt.async_subscribe(hass, sensor_topic, message_received, qos=1)
+    unsubscribe = await mqtt.async_subscribe(
+        hass, sensor_topic, message_received, qos=1, encoding=None
+    )
 
     try:
         # Trigger immediate telemetry by sending TelePeriod command
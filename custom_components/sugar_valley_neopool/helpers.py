@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+from functools import lru_cache
 import json
 import logging
 from typing import TYPE_CHECKING, Any, overload
@@ -13,21 +14,33 @@ if TYPE_CHECKING:
 _LOGGER = logging.getLogger(__name__)
 
 
+# Parsed dot-notation paths; entity descriptions use a fixed set of paths
+_path_cache: dict[str, tuple[tuple[str, int | None], ...]] = {}
+
+
+def _split_path(path: str) -> tuple[tuple[str, int | None], ...]:
+    """Split a dot-notation path into (key, list index) segments, cached per path."""
+    segments = _path_cache.get(path)
+    if segments is None:
+        segments = tuple((key, int(key) if key.isdecimal() else None) for key in path.split("."))
+        _path_cache[path] = segments
+    return segments
+
+
 def get_nested_value(data: dict[str, Any], path: str) -> Any | None:
     """Get a value from nested dictionary using dot notation path.
 
     Example: get_nested_value(data, "NeoPool.pH.Data")
     returns data["NeoPool"]["pH"]["Data"]
     """
-    keys = path.split(".")
     value = data
 
     try:
-        for key in keys:
+        for key, index in _split_path(path):
             if isinstance(value, dict):
                 value = value[key]
-            elif isinstance(value, list) and key.isdigit():
-                value = value[int(key)]
+            elif isinstance(value, list) and index is not None:
+                value = value[index]
             else:
                 return None
     except (KeyError, IndexError, TypeError):
@@ -41,7 +54,15 @@ def parse_runtime_duration(duration_str: str) -> float | None:
 
     Example: "123T04:30:00" -> 123*24 + 4 + 30/60 = 2956.5 hours
     """
-    if not duration_str or "T" not in duration_str:
+    if not duration_str or not isinstance(duration_str, str):
+        return None
+    return _parse_runtime_duration(duration_str)
+
+
+@lru_cache(maxsize=256)
+def _parse_runtime_duration(duration_str: str) -> float | None:
+    """Parse a runtime string, memoized since counters repeat between changes."""
+    if "T" not in duration_str:
         return None
 
     try:
@@ -129,6 +150,10 @@ def clamp(value: float, min_val: float, max_val: float) -> float:
     return max(min_val, min(max_val, value))
 
 
+# Lowercase substring present in every masked NodeID ('XXXX XXXX XXXX XXXX XXXX 3435')
+_MASKED_NODEID_MARKER = "xxxx xxxx"
+
+
 def is_nodeid_masked(nodeid: str | None) -> bool:
     """Check if a NodeID is masked (SetOption157 disabled).
 
@@ -146,14 +171,18 @@ def is_nodeid_masked(nodeid: str | None) -> bool:
     """
     if not nodeid:
         return True  # No NodeID = treat as masked
-    return "xxxx xxxx" in nodeid.lower()
+    return _MASKED_NODEID_MARKER in nodeid.lower()
+
+
+# Literal NodeID values Tasmota reports when the real ID is not exposed (lowercase)
+_HIDDEN_NODEIDS = frozenset({"hidden", "hidden_by_default"})
 
 
 def validate_nodeid(nodeid: str | None) -> bool:
     """Validate NodeID is present, not 'hidden', and not masked.
 
     This is the single source of truth for NodeID validation.
-    Uses is_nodeid_masked() internally for mask detection.
+    Shares the masked-NodeID marker with is_nodeid_masked().
 
     Args:
         nodeid: The NodeID value to validate.
@@ -164,12 +193,13 @@ def validate_nodeid(nodeid: str | None) -> bool:
     if nodeid is None or nodeid == "":
         return False
     if isinstance(nodeid, str):
-        nodeid_lower = nodeid.lower()
+        # Lowercase once for both the hidden and masked checks
+        lowered = nodeid.lower()
         # Check for literal hidden values
-        if nodeid_lower in ["hidden", "hidden_by_default"]:
+        if lowered in _HIDDEN_NODEIDS:
             return False
-        # Check for masked NodeID pattern using single source of truth
-        if is_nodeid_masked(nodeid):
+        # Check for masked NodeID pattern (same marker as is_nodeid_masked)
+        if _MASKED_NODEID_MARKER in lowered:
             return False
     return True
 
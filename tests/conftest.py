@@ -2,25 +2,46 @@
 
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import Awaitable, Callable, Generator
+from contextlib import ExitStack, contextmanager
 import json
+from types import SimpleNamespace
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from custom_components import sugar_valley_neopool as neopool
 from custom_components.sugar_valley_neopool import NeoPoolData
-from custom_components.sugar_valley_neopool.const import DOMAIN
+from custom_components.sugar_valley_neopool.const import (
+    CONF_DEVICE_NAME,
+    CONF_DISCOVERY_PREFIX,
+    CONF_NODEID,
+    DOMAIN,
+)
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant
+
+# Attach an MQTT entity to mock hass and return its SENSOR message callback
+type MqttAttach = Callable[[Any, str], Awaitable[Callable[[Any], None]]]
+
+# Build a MockConfigEntry registered with hass; keyword arguments override defaults
+type MakeEntry = Callable[..., MockConfigEntry]
 
 # Register pytest-homeassistant-custom-component plugin
 pytest_plugins = ["pytest_homeassistant_custom_component"]
 
 
 @pytest.fixture(autouse=True)
-def auto_enable_custom_integrations(
-    enable_custom_integrations: None,
-) -> None:
-    """Enable custom integrations for all tests."""
+def auto_enable_custom_integrations(request: pytest.FixtureRequest) -> None:
+    """Enable custom integrations for all tests that use hass.
+
+    Requesting enable_custom_integrations unconditionally would start a Home
+    Assistant instance even for pure-Python tests that never touch it.
+    """
+    if "hass" in request.fixturenames:
+        request.getfixturevalue("enable_custom_integrations")
 
 
 @pytest.fixture
@@ -149,6 +170,20 @@ SAMPLE_NEOPOOL_PAYLOAD_HIDDEN_NODEID: dict[str, Any] = {
     }
 }
 
+# Config entry data used by the integration setup tests (copy before mutating)
+SAMPLE_ENTRY_DATA: dict[str, Any] = {
+    CONF_DEVICE_NAME: "Test Pool",
+    CONF_DISCOVERY_PREFIX: "SmartPool",
+    CONF_NODEID: "ABC123",
+}
+
+# Encoded parse_json_payload inputs shared by the helper tests (treat as read-only)
+SAMPLE_JSON_BYTEARRAY = bytearray(b'{"key": "value"}')
+SAMPLE_JSON_INVALID_UTF8 = b"\xff\xfe"  # Invalid UTF-8 sequence
+
+# Marks async tests that need no per-test loop isolation to share one module loop
+MODULE_LOOP = pytest.mark.asyncio(loop_scope="module")
+
 
 @pytest.fixture
 def sample_payload() -> dict[str, Any]:
@@ -162,6 +197,12 @@ def sample_payload_minimal() -> dict[str, Any]:
     return SAMPLE_NEOPOOL_PAYLOAD_MINIMAL.copy()
 
 
+@pytest.fixture(scope="session")
+def mock_entities_10() -> list[MagicMock]:
+    """Return 10 read-only mock registry entities (sensor.entity_0..9)."""
+    return [MagicMock(entity_id=f"sensor.entity_{i}") for i in range(10)]
+
+
 @pytest.fixture
 def mock_neopool_data() -> NeoPoolData:
     """Create mock NeoPoolData."""
@@ -196,6 +237,88 @@ def mock_config_entry(mock_neopool_data: NeoPoolData) -> MagicMock:
     return entry
 
 
+@pytest.fixture
+def make_entry(hass: HomeAssistant) -> MakeEntry:
+    """Return a builder for config entries added to hass.
+
+    Entries default to a copy of SAMPLE_ENTRY_DATA; any MockConfigEntry keyword
+    can be overridden.
+    """
+
+    def _make(**kwargs: Any) -> MockConfigEntry:
+        entry = MockConfigEntry(
+            **{
+                "domain": DOMAIN,
+                "data": SAMPLE_ENTRY_DATA.copy(),
+                **kwargs,
+            }
+        )
+        entry.add_to_hass(hass)
+        return entry
+
+    return _make
+
+
+@contextmanager
+def attr_swap[T](obj: object, name: str, value: T) -> Generator[T]:
+    """Temporarily replace an attribute on obj and yield the replacement.
+
+    A lighter alternative to patch.object for plain instance attribute stubs.
+    """
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield value
+    finally:
+        setattr(obj, name, original)
+
+
+@pytest.fixture
+def setup_patches(hass: HomeAssistant) -> Generator[SimpleNamespace]:
+    """Patch MQTT readiness and setup side effects for async_setup_entry.
+
+    Yields the mocks as wait_for_mqtt, forward_setups, fetch_metadata,
+    migrate_unique_ids and so157_enforcement.
+    """
+    with ExitStack() as stack:
+        yield SimpleNamespace(
+            wait_for_mqtt=stack.enter_context(
+                patch.object(mqtt, "async_wait_for_mqtt_client", return_value=True)
+            ),
+            forward_setups=stack.enter_context(
+                attr_swap(
+                    hass.config_entries,
+                    "async_forward_entry_setups",
+                    AsyncMock(return_value=True),
+                )
+            ),
+            fetch_metadata=stack.enter_context(
+                patch.object(
+                    neopool,
+                    "async_fetch_device_metadata",
+                    new_callable=AsyncMock,
+                    return_value=None,
+                )
+            ),
+            migrate_unique_ids=stack.enter_context(
+                patch.object(
+                    neopool,
+                    "async_migrate_masked_unique_ids",
+                    new_callable=AsyncMock,
+                    return_value=True,
+                )
+            ),
+            so157_enforcement=stack.enter_context(
+                patch.object(
+                    neopool,
+                    "_setup_setoption157_enforcement",
+                    new_callable=AsyncMock,
+                    return_value=None,
+                )
+            ),
+        )
+
+
 @pytest.fixture
 def mock_hass() -> MagicMock:
     """Create mock Home Assistant instance."""
@@ -207,6 +330,43 @@ def mock_hass() -> MagicMock:
     return hass
 
 
+class _StateWriteCounter:
+    """Cheap async_write_ha_state replacement that counts state writes."""
+
+    __slots__ = ("n",)
+
+    def __init__(self) -> None:
+        self.n = 0
+
+    def __call__(self) -> None:
+        self.n += 1
+
+
+@pytest.fixture
+def mqtt_attach(mock_hass: MagicMock, monkeypatch: pytest.MonkeyPatch) -> MqttAttach:
+    """Patch MQTT subscribe once and attach entities to mock hass.
+
+    The returned helper wires up the entity, runs async_added_to_hass() and
+    returns the callback registered for the tele/<topic>/SENSOR topic.
+    """
+    sensor_callbacks: list[Callable[[Any], None]] = []
+
+    async def capture_callback(hass, topic, callback, **kwargs):
+        if "SENSOR" in topic:
+            sensor_callbacks.append(callback)
+        return MagicMock()
+
+    async def attach(entity: Any, entity_id: str) -> Callable[[Any], None]:
+        entity.hass = mock_hass
+        entity.entity_id = entity_id
+        entity.async_write_ha_state = _StateWriteCounter()
+        await entity.async_added_to_hass()
+        return sensor_callbacks[-1]
+
+    monkeypatch.setattr(mqtt, "async_subscribe", capture_callback)
+    return attach
+
+
 @pytest.fixture
 def mock_device_registry() -> Generator[MagicMock]:
     """Mock device registry."""
@@ -11,6 +11,8 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -619,8 +621,14 @@ class TestSetupEntryLogging:
     """Tests for async_setup_entry logging paths - lines 138, 140, 257."""
 
     @pytest.mark.asyncio
-    async def test_setup_logs_entity_mapping_details(self, hass: HomeAssistant) -> None:
+    async def test_setup_logs_entity_mapping_details(
+        self,
+        hass: HomeAssistant,
+        caplog: pytest.LogCaptureFixture,
+        setup_patches: SimpleNamespace,
+    ) -> None:
         """Test setup logs entity mapping details when mapping exists."""
+        caplog.set_level(logging.DEBUG, logger="custom_components.sugar_valley_neopool")
         entry = MockConfigEntry(
             domain=DOMAIN,
             data={
@@ -647,24 +655,8 @@ class TestSetupEntryLogging:
             )
 
         with (
-            patch("homeassistant.components.mqtt.async_wait_for_mqtt_client", return_value=True),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-            ),
             patch(
                 "custom_components.sugar_valley_neopool._apply_entity_id_mapping",
-                new_callable=AsyncMock,
             ),
             patch(
                 "custom_components.sugar_valley_neopool._cleanup_orphaned_yaml_entities",
@@ -674,6 +666,7 @@ class TestSetupEntryLogging:
             result = await async_setup_entry(hass, entry)
 
         assert result is True
+        assert "... and 5 more" in caplog.text
 
 
 # =============================================================================
@@ -5,6 +5,9 @@ This file targets specific uncovered code paths identified through coverage anal
 
 from __future__ import annotations
 
+from collections.abc import Generator
+from types import MappingProxyType
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 
 import pytest
@@ -36,31 +39,47 @@ from custom_components.sugar_valley_neopool.select import create_value_fn
 from homeassistant.config_entries import SOURCE_USER
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResultType
-from homeassistant.helpers import device_registry as dr
+
+_BASE_DATA = MappingProxyType(
+    {
+        CONF_DEVICE_NAME: "Test Pool",
+        CONF_DISCOVERY_PREFIX: "SmartPool",
+        CONF_NODEID: "ABC123",
+    }
+)
+
+# async_remove_config_entry_device never inspects the device, so any object will do
+_MOCK_DEVICE: Any = object()
+
+
+def _validate_result(*, valid: bool = True, nodeid: str | None = "hidden") -> dict[str, Any]:
+    """Build a _validate_yaml_topic result."""
+    return {"valid": valid, "nodeid": nodeid, "payload": {}}
 
 
 class TestGetTopicsFromConfig:
     """Tests for get_topics_from_config function."""
 
-    def test_returns_empty_set_when_no_entries(self, hass: HomeAssistant) -> None:
+    def test_returns_empty_set_when_no_entries(self) -> None:
         """Test returns empty set when no config entries."""
-        result = get_topics_from_config(hass)
-        # Should return set with None since no entries exist
-        assert isinstance(result, set)
+        hass_mock = MagicMock()
+        hass_mock.config_entries.async_entries.return_value = []
 
-    def test_returns_topics_from_entries(self, hass: HomeAssistant) -> None:
-        """Test returns topics from existing config entries."""
-        entry1 = MockConfigEntry(
-            domain=DOMAIN,
-            data={CONF_DISCOVERY_PREFIX: "SmartPool1"},
-        )
-        entry1.add_to_hass(hass)
+        result = get_topics_from_config(hass_mock)
 
-        entry2 = MockConfigEntry(
-            domain=DOMAIN,
-            data={CONF_DISCOVERY_PREFIX: "SmartPool2"},
-        )
-        entry2.add_to_hass(hass)
+        assert result == set()
+        hass_mock.config_entries.async_entries.assert_called_once_with(DOMAIN)
+
+    def test_returns_topics_from_entries(
+        self, hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test returns topics from existing config entries."""
+        entries = [
+            MockConfigEntry(domain=DOMAIN, data={CONF_DISCOVERY_PREFIX: prefix})
+            for prefix in ("SmartPool1", "SmartPool2")
+        ]
+        # Only iteration over the entries matters, skip the registry add path
+        monkeypatch.setattr(hass.config_entries, "async_entries", lambda *args, **kwargs: entries)
 
         result = get_topics_from_config(hass)
 
@@ -71,10 +90,10 @@ class TestGetTopicsFromConfig:
 class TestMqttConfirmStep:
     """Tests for async_step_mqtt_confirm with user input."""
 
-    async def test_mqtt_confirm_creates_entry(self, hass: HomeAssistant) -> None:
+    async def test_mqtt_confirm_creates_entry(self) -> None:
         """Test MQTT confirm step creates entry with user input."""
         flow = NeoPoolConfigFlow()
-        flow.hass = hass
+        flow.hass = MagicMock()
         flow.context = {"source": SOURCE_USER}
         flow._discovery_prefix = "SmartPool"
         flow._device_name = "Auto Pool"
@@ -87,10 +106,10 @@ class TestMqttConfirmStep:
         assert result["data"][CONF_DEVICE_NAME] == "Custom Pool Name"
         assert result["data"][CONF_NODEID] == "ABC123"
 
-    async def test_mqtt_confirm_uses_default_name(self, hass: HomeAssistant) -> None:
+    async def test_mqtt_confirm_uses_default_name(self) -> None:
         """Test MQTT confirm uses discovered name when no input."""
         flow = NeoPoolConfigFlow()
-        flow.hass = hass
+        flow.hass = MagicMock()
         flow.context = {"source": SOURCE_USER}
         flow._discovery_prefix = "SmartPool"
         flow._device_name = "Discovered Pool"
@@ -110,11 +129,7 @@ class TestOptionsFlow:
         """Test options flow init step shows form."""
         entry = MockConfigEntry(
             domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
+            data=dict(_BASE_DATA),
             options={},
         )
         entry.add_to_hass(hass)
@@ -135,11 +150,7 @@ class TestOptionsFlow:
         """Test options flow creates entry with user input."""
         entry = MockConfigEntry(
             domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
+            data=dict(_BASE_DATA),
             options={},
         )
         entry.add_to_hass(hass)
@@ -150,13 +161,13 @@ class TestOptionsFlow:
             new_callable=AsyncMock,
             return_value=True,
         ):
-            # Initialize options flow properly
-            result = await hass.config_entries.options.async_init(entry.entry_id)
-            assert result["type"] == FlowResultType.FORM
+            # Form rendering is covered by test_options_flow_init_shows_form,
+            # only the flow_id is needed here to submit the form
+            flow_id = (await hass.config_entries.options.async_init(entry.entry_id))["flow_id"]
 
             # Submit the form - SO157 is no longer in the form (auto-enforced)
             result = await hass.config_entries.options.async_configure(
-                result["flow_id"],
+                flow_id,
                 {
                     CONF_RECOVERY_SCRIPT: "script.test_recovery",
                     CONF_ENABLE_REPAIR_NOTIFICATION: True,
@@ -175,11 +186,7 @@ class TestOptionsFlow:
         """Test options flow shows existing values."""
         entry = MockConfigEntry(
             domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
+            data=dict(_BASE_DATA),
             options={
                 CONF_RECOVERY_SCRIPT: "script.existing",
                 CONF_ENABLE_REPAIR_NOTIFICATION: False,
@@ -205,35 +212,49 @@ class TestOptionsFlow:
 class TestReconfigureFlow:
     """Extended tests for reconfigure flow."""
 
-    async def test_reconfigure_invalid_topic_validation_fails(self, hass: HomeAssistant) -> None:
-        """Test reconfigure when topic validation fails (timeout/no message)."""
+    @pytest.mark.parametrize(
+        ("validation", "auto_result", "expected_error"),
+        [
+            (_validate_result(valid=False, nodeid=None), None, "cannot_connect"),
+            (
+                _validate_result(),
+                {"success": False, "error": "Failed"},
+                "nodeid_configuration_failed",
+            ),
+        ],
+        ids=["validation_fails", "nodeid_config_fails"],
+    )
+    async def test_reconfigure_shows_error(
+        self,
+        hass: HomeAssistant,
+        validation: dict[str, Any],
+        auto_result: dict[str, Any] | None,
+        expected_error: str,
+    ) -> None:
+        """Test reconfigure shows form with error when validation or auto-config fails."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
         flow.context = {"source": "reconfigure"}
 
         mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
+        mock_entry.data = dict(_BASE_DATA)
         flow._get_reconfigure_entry = MagicMock(return_value=mock_entry)
 
-        # Mock _validate_yaml_topic to return invalid (simulates timeout or bad topic)
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": False, "nodeid": None, "payload": {}}
-        )
+        # Invalid validation simulates timeout or bad topic, hidden NodeID triggers auto-config
+        flow._validate_yaml_topic = AsyncMock(return_value=validation)
+        flow._auto_configure_nodeid = AsyncMock(return_value=auto_result)
 
         result = await flow.async_step_reconfigure(
             {
                 CONF_DEVICE_NAME: "New Name",
-                CONF_DISCOVERY_PREFIX: "invalid_topic",
+                CONF_DISCOVERY_PREFIX: "NewTopic",
             }
         )
 
-        # Should show form with error for invalid topic (cannot_connect is used for validation failures)
         assert result["type"] == FlowResultType.FORM
-        assert result["errors"]["base"] == "cannot_connect"
+        assert result["errors"]["base"] == expected_error
+        if auto_result is None:
+            flow._auto_configure_nodeid.assert_not_called()
 
     async def test_reconfigure_hidden_nodeid_auto_config(self, hass: HomeAssistant) -> None:
         """Test reconfigure with hidden NodeID triggers auto-config."""
@@ -242,18 +263,12 @@ class TestReconfigureFlow:
         flow.context = {"source": "reconfigure"}
 
         mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
+        mock_entry.data = dict(_BASE_DATA)
         mock_entry.unique_id = "sugar_valley_neopool_ABC123"
         flow._get_reconfigure_entry = MagicMock(return_value=mock_entry)
 
         # Validation returns hidden NodeID
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "hidden", "payload": {}}
-        )
+        flow._validate_yaml_topic = AsyncMock(return_value=_validate_result())
         # Auto-config succeeds with same NodeID
         flow._auto_configure_nodeid = AsyncMock(return_value={"success": True, "nodeid": "ABC123"})
 
@@ -275,35 +290,6 @@ class TestReconfigureFlow:
 
         flow._auto_configure_nodeid.assert_called_once_with("NewTopic")
 
-    async def test_reconfigure_nodeid_config_failure(self, hass: HomeAssistant) -> None:
-        """Test reconfigure when NodeID auto-config fails."""
-        flow = NeoPoolConfigFlow()
-        flow.hass = hass
-        flow.context = {"source": "reconfigure"}
-
-        mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
-        flow._get_reconfigure_entry = MagicMock(return_value=mock_entry)
-
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "hidden", "payload": {}}
-        )
-        flow._auto_configure_nodeid = AsyncMock(return_value={"success": False, "error": "Failed"})
-
-        result = await flow.async_step_reconfigure(
-            {
-                CONF_DEVICE_NAME: "New Name",
-                CONF_DISCOVERY_PREFIX: "NewTopic",
-            }
-        )
-
-        assert result["type"] == FlowResultType.FORM
-        assert result["errors"]["base"] == "nodeid_configuration_failed"
-
 
 class TestYamlPrefixStep:
     """Tests for async_step_yaml_prefix."""
@@ -319,26 +305,21 @@ class TestYamlPrefixStep:
         assert result["type"] == FlowResultType.FORM
         assert result["step_id"] == "yaml_prefix"
 
-    async def test_yaml_prefix_empty_prefix_error(self, hass: HomeAssistant) -> None:
-        """Test yaml_prefix with empty prefix shows error."""
-        flow = NeoPoolConfigFlow()
-        flow.hass = hass
-        flow.context = {"source": SOURCE_USER}
-        flow._find_migratable_entities = MagicMock(return_value=[])
-
-        result = await flow.async_step_yaml_prefix({"unique_id_prefix": ""})
-
-        assert result["type"] == FlowResultType.FORM
-        assert result["errors"]["base"] == "no_entities_found"
-
-    async def test_yaml_prefix_no_matching_entities(self, hass: HomeAssistant) -> None:
-        """Test yaml_prefix when no entities match prefix."""
+    @pytest.fixture
+    def yaml_prefix_flow(self, hass: HomeAssistant) -> NeoPoolConfigFlow:
+        """Return a flow whose prefix lookup finds no entities."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
         flow.context = {"source": SOURCE_USER}
         flow._find_migratable_entities = MagicMock(return_value=[])
+        return flow
 
-        result = await flow.async_step_yaml_prefix({"unique_id_prefix": "custom_prefix_"})
+    @pytest.mark.parametrize("prefix", ["", "custom_prefix_"], ids=["empty", "custom"])
+    async def test_yaml_prefix_no_entities(
+        self, yaml_prefix_flow: NeoPoolConfigFlow, prefix: str
+    ) -> None:
+        """Test yaml_prefix shows error when no entities match the prefix."""
+        result = await yaml_prefix_flow.async_step_yaml_prefix({"unique_id_prefix": prefix})
 
         assert result["type"] == FlowResultType.FORM
         assert result["errors"]["base"] == "no_entities_found"
@@ -347,10 +328,10 @@ class TestYamlPrefixStep:
 class TestYamlConfirmStep:
     """Tests for async_step_yaml_confirm."""
 
-    async def test_yaml_confirm_no_confirmation_error(self, hass: HomeAssistant) -> None:
+    async def test_yaml_confirm_no_confirmation_error(self) -> None:
         """Test yaml_confirm without confirmation checkbox shows error."""
         flow = NeoPoolConfigFlow()
-        flow.hass = hass
+        flow.hass = MagicMock()
         flow.context = {"source": SOURCE_USER}
         flow._yaml_topic = "SmartPool"
         flow._nodeid = "ABC123"
@@ -365,42 +346,22 @@ class TestYamlConfirmStep:
 class TestFormatEntityList:
     """Tests for _format_entity_list method."""
 
-    def test_format_less_than_five_entities(self) -> None:
-        """Test formatting less than 5 entities."""
-        flow = NeoPoolConfigFlow()
-
-        entities = [MagicMock(entity_id=f"sensor.entity_{i}") for i in range(3)]
-
-        result = flow._format_entity_list(entities)
-
-        assert "sensor.entity_0" in result
-        assert "sensor.entity_1" in result
-        assert "sensor.entity_2" in result
-        assert "more" not in result
-
-    def test_format_more_than_five_entities(self) -> None:
-        """Test formatting more than 5 entities shows count."""
-        flow = NeoPoolConfigFlow()
-
-        entities = [MagicMock(entity_id=f"sensor.entity_{i}") for i in range(10)]
-
-        result = flow._format_entity_list(entities)
-
-        assert "sensor.entity_0" in result
-        assert "sensor.entity_4" in result
-        assert "5 more" in result
-
-    def test_format_exactly_five_entities(self) -> None:
-        """Test formatting exactly 5 entities."""
-        flow = NeoPoolConfigFlow()
-
-        entities = [MagicMock(entity_id=f"sensor.entity_{i}") for i in range(5)]
-
-        result = flow._format_entity_list(entities)
+    @pytest.mark.parametrize(
+        ("count", "expect_more"),
+        [(3, False), (5, False), (10, True)],
+        ids=["less_than_five", "exactly_five", "more_than_five"],
+    )
+    def test_format_entity_list(
+        self, mock_entities_10: list[MagicMock], count: int, expect_more: bool
+    ) -> None:
+        """Test formatting shows first 5 entities and a count of the rest."""
+        result = NeoPoolConfigFlow()._format_entity_list(mock_entities_10[:count])
 
-        assert "sensor.entity_0" in result
-        assert "sensor.entity_4" in result
-        assert "more" not in result
+        for entity in mock_entities_10[: min(count, 5)]:
+            assert entity.entity_id in result
+        assert ("more" in result) == expect_more
+        if expect_more:
+            assert f"{count - 5} more" in result
 
 
 class TestAsyncRemoveConfigEntryDevice:
@@ -411,11 +372,7 @@ class TestAsyncRemoveConfigEntryDevice:
         """Test function always returns False to prevent device removal."""
         entry = MockConfigEntry(
             domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
+            data=dict(_BASE_DATA),
         )
         entry.add_to_hass(hass)
         entry.runtime_data = NeoPoolData(
@@ -424,9 +381,7 @@ class TestAsyncRemoveConfigEntryDevice:
             nodeid="ABC123",
         )
 
-        mock_device = MagicMock(spec=dr.DeviceEntry)
-
-        result = await async_remove_config_entry_device(hass, entry, mock_device)
+        result = await async_remove_config_entry_device(hass, entry, _MOCK_DEVICE)
 
         assert result is False
 
@@ -507,18 +462,36 @@ class TestCreateValueFn:
 class TestDiscoverDeviceHiddenNodeid:
     """Tests for discover_device with hidden NodeID."""
 
-    async def test_discover_device_hidden_nodeid_auto_config(self, hass: HomeAssistant) -> None:
+    @pytest.mark.parametrize(
+        ("auto_result", "expected_type", "expected_reason"),
+        [
+            (
+                {"success": True, "nodeid": "CONFIGURED123"},
+                FlowResultType.CREATE_ENTRY,
+                None,
+            ),
+            (
+                {"success": False, "error": "Failed to configure"},
+                FlowResultType.ABORT,
+                "nodeid_configuration_failed",
+            ),
+        ],
+        ids=["auto_config_success", "auto_config_failure"],
+    )
+    async def test_discover_device_hidden_nodeid(
+        self,
+        hass: HomeAssistant,
+        auto_result: dict[str, Any],
+        expected_type: FlowResultType,
+        expected_reason: str | None,
+    ) -> None:
         """Test discover_device with hidden NodeID triggers auto-config."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
         flow.context = {"source": SOURCE_USER}
 
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "hidden", "payload": {}}
-        )
-        flow._auto_configure_nodeid = AsyncMock(
-            return_value={"success": True, "nodeid": "CONFIGURED123"}
-        )
+        flow._validate_yaml_topic = AsyncMock(return_value=_validate_result())
+        flow._auto_configure_nodeid = AsyncMock(return_value=auto_result)
         flow.async_set_unique_id = AsyncMock()
         flow._abort_if_unique_id_configured = MagicMock()
 
@@ -530,48 +503,31 @@ class TestDiscoverDeviceHiddenNodeid:
         )
 
         flow._auto_configure_nodeid.assert_called_once_with("SmartPool")
-        assert result["type"] == FlowResultType.CREATE_ENTRY
-
-    async def test_discover_device_auto_config_failure(self, hass: HomeAssistant) -> None:
-        """Test discover_device aborts when auto-config fails."""
-        flow = NeoPoolConfigFlow()
-        flow.hass = hass
-        flow.context = {"source": SOURCE_USER}
+        assert result["type"] == expected_type
+        if expected_reason is not None:
+            assert result["reason"] == expected_reason
 
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "hidden", "payload": {}}
-        )
-        flow._auto_configure_nodeid = AsyncMock(
-            return_value={"success": False, "error": "Failed to configure"}
-        )
 
-        result = await flow.async_step_discover_device(
-            {
-                CONF_DEVICE_NAME: "My Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-            }
-        )
+class TestAutoDetectTimeout:
+    """Tests for auto-detection timeout scenarios."""
 
-        assert result["type"] == FlowResultType.ABORT
-        assert result["reason"] == "nodeid_configuration_failed"
+    @pytest.fixture(autouse=True)
+    def mock_subscribe(self) -> Generator[None]:
+        """Subscribe without ever delivering a message."""
 
+        async def _subscribe(hass, topic, callback, **kwargs):
+            return MagicMock()
 
-class TestAutoDetectTimeout:
-    """Tests for auto-detection timeout scenarios."""
+        with patch("homeassistant.components.mqtt.async_subscribe", side_effect=_subscribe):
+            yield
 
     async def test_auto_detect_timeout_returns_none(self, hass: HomeAssistant) -> None:
         """Test auto-detection returns None on timeout."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
 
-        async def mock_subscribe(hass, topic, callback, **kwargs):
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=mock_subscribe,
-        ):
-            result = await flow._auto_detect_topic(timeout_seconds=0.1)
+        # A zero timeout expires immediately since no message is ever delivered
+        result = await flow._auto_detect_topic(timeout_seconds=0)
 
         assert result is None
 
@@ -580,14 +536,7 @@ class TestAutoDetectTimeout:
         flow = NeoPoolConfigFlow()
         flow.hass = hass
 
-        async def mock_subscribe(hass, topic, callback, **kwargs):
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=mock_subscribe,
-        ):
-            result = await flow._validate_yaml_topic("SmartPool", timeout_seconds=0.1)
+        result = await flow._validate_yaml_topic("SmartPool", timeout_seconds=0)
 
         assert result["valid"] is False
 
@@ -603,11 +552,19 @@ class TestYamlDetectAutoConfigFailure:
         flow.hass = hass
         flow.context = {"source": SOURCE_USER}
 
-        flow._auto_detect_topic = AsyncMock(return_value="SmartPool")
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "hidden", "payload": {}}
-        )
-        flow._auto_configure_nodeid = AsyncMock(return_value={"success": False, "error": "Failed"})
+        # Plain coroutines are enough for helpers whose calls are not asserted
+        async def _detect() -> str:
+            return "SmartPool"
+
+        async def _validate(topic: str) -> dict[str, Any]:
+            return _validate_result()
+
+        async def _auto_configure(topic: str) -> dict[str, Any]:
+            return {"success": False, "error": "Failed"}
+
+        flow._auto_detect_topic = _detect
+        flow._validate_yaml_topic = _validate
+        flow._auto_configure_nodeid = _auto_configure
         flow.async_step_yaml_topic = AsyncMock(
             return_value={"type": FlowResultType.FORM, "step_id": "yaml_topic"}
         )
@@ -621,50 +578,27 @@ class TestYamlDetectAutoConfigFailure:
 class TestMqttDiscoveryEdgeCases:
     """Edge case tests for MQTT discovery."""
 
-    async def test_mqtt_discovery_invalid_topic_format(self, hass: HomeAssistant) -> None:
-        """Test MQTT discovery with invalid topic format."""
-        flow = NeoPoolConfigFlow()
-        flow.hass = hass
-        flow.context = {"source": "mqtt"}
-
-        mock_discovery = MagicMock()
-        mock_discovery.topic = "invalid_topic"
-        mock_discovery.payload = '{"NeoPool": {}}'
-
-        result = await flow.async_step_mqtt(mock_discovery)
-
-        assert result["type"] == FlowResultType.ABORT
-        assert result["reason"] == "invalid_discovery_info"
-
-    async def test_mqtt_discovery_non_neopool_device(self, hass: HomeAssistant) -> None:
-        """Test MQTT discovery rejects non-NeoPool devices."""
-        flow = NeoPoolConfigFlow()
-        flow.hass = hass
-        flow.context = {"source": "mqtt"}
-
-        mock_discovery = MagicMock()
-        mock_discovery.topic = "tele/SomeDevice/SENSOR"
-        mock_discovery.payload = '{"SomeOtherDevice": {}}'
-
-        result = await flow.async_step_mqtt(mock_discovery)
-
-        assert result["type"] == FlowResultType.ABORT
-        assert result["reason"] == "not_neopool_device"
-
-    async def test_mqtt_discovery_invalid_json(self, hass: HomeAssistant) -> None:
-        """Test MQTT discovery with invalid JSON."""
+    @pytest.mark.parametrize(
+        ("topic", "payload", "reason"),
+        [
+            ("invalid_topic", '{"NeoPool": {}}', "invalid_discovery_info"),
+            ("tele/SomeDevice/SENSOR", '{"SomeOtherDevice": {}}', "not_neopool_device"),
+            ("tele/SmartPool/SENSOR", "not valid json", "invalid_discovery_info"),
+        ],
+        ids=["invalid_topic_format", "non_neopool_device", "invalid_json"],
+    )
+    async def test_mqtt_discovery_abort(self, topic: str, payload: str, reason: str) -> None:
+        """Test MQTT discovery aborts on bad topic, foreign device or invalid JSON."""
         flow = NeoPoolConfigFlow()
-        flow.hass = hass
+        flow.hass = MagicMock()
         flow.context = {"source": "mqtt"}
 
-        mock_discovery = MagicMock()
-        mock_discovery.topic = "tele/SmartPool/SENSOR"
-        mock_discovery.payload = "not valid json"
+        mock_discovery = MagicMock(topic=topic, payload=payload)
 
         result = await flow.async_step_mqtt(mock_discovery)
 
         assert result["type"] == FlowResultType.ABORT
-        assert result["reason"] == "invalid_discovery_info"
+        assert result["reason"] == reason
 
 
 class TestAutoConfigureNodeid:
@@ -674,10 +608,10 @@ class TestAutoConfigureNodeid:
         """Test auto-configure publishes TelePeriod command after SO157 enabled."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
+        flow._wait_for_nodeid = AsyncMock(return_value="NEW123")
 
         with (
             patch("homeassistant.components.mqtt.async_publish") as mock_publish,
-            patch.object(flow, "_wait_for_nodeid", return_value="NEW123"),
             patch(
                 "custom_components.sugar_valley_neopool.config_flow.async_ensure_setoption157_enabled",
                 new_callable=AsyncMock,
@@ -688,9 +622,9 @@ class TestAutoConfigureNodeid:
 
         # _auto_configure_nodeid publishes TelePeriod command (SO157 is mocked)
         assert mock_publish.call_count == 1
-        # Verify TelePeriod command was published
-        all_calls = str(mock_publish.call_args_list)
-        assert "cmnd/SmartPool/TelePeriod" in all_calls
+        # Verify TelePeriod command was published (topic is the second positional arg)
+        args, _ = mock_publish.call_args
+        assert args[1] == "cmnd/SmartPool/TelePeriod"
         assert result["success"] is True
         assert result["nodeid"] == "NEW123"
 
@@ -698,10 +632,10 @@ class TestAutoConfigureNodeid:
         """Test auto-configure fails when NodeID not received."""
         flow = NeoPoolConfigFlow()
         flow.hass = hass
+        flow._wait_for_nodeid = AsyncMock(return_value=None)
 
         with (
             patch("homeassistant.components.mqtt.async_publish"),
-            patch.object(flow, "_wait_for_nodeid", return_value=None),
             patch(
                 "custom_components.sugar_valley_neopool.config_flow.async_ensure_setoption157_enabled",
                 new_callable=AsyncMock,
@@ -720,11 +654,7 @@ class TestShowOptionsFormStatus:
     async def test_show_form_setoption157_disabled_status(self, hass: HomeAssistant) -> None:
         """Test status message when SetOption157 is disabled."""
         mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
+        mock_entry.data = dict(_BASE_DATA)
         mock_entry.options = {}
         mock_entry.entry_id = "test_entry_id"
 
@@ -746,11 +676,7 @@ class TestShowOptionsFormStatus:
     async def test_show_form_setoption157_none_status(self, hass: HomeAssistant) -> None:
         """Test status message when SetOption157 status is None (couldn't query)."""
         mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
+        mock_entry.data = dict(_BASE_DATA)
         mock_entry.options = {}
         mock_entry.entry_id = "test_entry_id"
 
@@ -771,11 +697,7 @@ class TestShowOptionsFormStatus:
     async def test_show_form_setoption157_enabled_status(self, hass: HomeAssistant) -> None:
         """Test status message when SetOption157 is enabled."""
         mock_entry = MagicMock()
-        mock_entry.data = {
-            CONF_DEVICE_NAME: "Test Pool",
-            CONF_DISCOVERY_PREFIX: "SmartPool",
-            CONF_NODEID: "ABC123",
-        }
+        mock_entry.data = dict(_BASE_DATA)
         mock_entry.options = {}
         mock_entry.entry_id = "test_entry_id"
 
@@ -935,9 +857,7 @@ class TestReconfigureRegenerateEntityIds:
         mock_entry.unique_id = "sugar_valley_neopool_ABC123"
         flow._get_reconfigure_entry = MagicMock(return_value=mock_entry)
 
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "ABC123", "payload": {}}
-        )
+        flow._validate_yaml_topic = AsyncMock(return_value=_validate_result(nodeid="ABC123"))
 
         async def mock_set_unique_id(uid):
             flow._unique_id = uid
@@ -975,9 +895,7 @@ class TestReconfigureRegenerateEntityIds:
         mock_entry.unique_id = "sugar_valley_neopool_ABC123"
         flow._get_reconfigure_entry = MagicMock(return_value=mock_entry)
 
-        flow._validate_yaml_topic = AsyncMock(
-            return_value={"valid": True, "nodeid": "ABC123", "payload": {}}
-        )
+        flow._validate_yaml_topic = AsyncMock(return_value=_validate_result(nodeid="ABC123"))
 
         async def mock_set_unique_id(uid):
             flow._unique_id = uid
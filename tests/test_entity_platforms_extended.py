@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
-import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
 
 import pytest
 
@@ -12,7 +14,6 @@ from custom_components.sugar_valley_neopool.binary_sensor import (
     NeoPoolBinarySensorEntityDescription,
 )
 from custom_components.sugar_valley_neopool.entity import NeoPoolEntity, NeoPoolMQTTEntity
-from custom_components.sugar_valley_neopool.helpers import bit_to_bool
 from custom_components.sugar_valley_neopool.number import (
     NeoPoolNumber,
     NeoPoolNumberEntityDescription,
@@ -25,6 +26,60 @@ from custom_components.sugar_valley_neopool.switch import (
     NeoPoolSwitch,
     NeoPoolSwitchEntityDescription,
 )
+from homeassistant.components import mqtt
+
+from .conftest import MODULE_LOOP, MqttAttach
+
+# MQTT payloads as raw JSON literals
+_RELAY_STATE_7 = '{"NeoPool":{"Relay":{"State":[1,1,0,0,0,0,0]}}}'
+_RELAY_STATE_EMPTY = '{"NeoPool":{"Relay":{"State":[]}}}'
+_RELAY_STATE_SCALAR = '{"NeoPool":{"Relay":{"State":"not_array"}}}'
+_AUX_4 = '{"NeoPool":{"Relay":{"Aux":[1,0,0,0]}}}'
+_AUX_EMPTY = '{"NeoPool":{"Relay":{"Aux":[]}}}'
+_AUX_SCALAR = '{"NeoPool":{"Relay":{"Aux":"not_array"}}}'
+_TEST_VALUE_1 = '{"NeoPool":{"Test":{"Value":1}}}'
+_TEST_MODE_1 = '{"NeoPool":{"Test":{"Mode":1}}}'
+_TEST_MODE_INVALID = '{"NeoPool":{"Test":{"Mode":"invalid"}}}'
+_INVALID_JSON = "not valid json"
+_INVALID_JSON_BRACES = "invalid json {{"
+_NOT_JSON = "not json"
+
+# Entity descriptions shared across tests; vary fields with dataclasses.replace()
+_BIN_DESC_TEST = NeoPoolBinarySensorEntityDescription(
+    key="test_sensor",
+    name="Test Sensor",
+    json_path="NeoPool.Test.Value",
+)
+_SWITCH_DESC_TEST = NeoPoolSwitchEntityDescription(
+    key="test_switch",
+    name="Test Switch",
+    json_path="NeoPool.Test.State",
+    command="NPTest",
+)
+_SELECT_DESC_TEST = NeoPoolSelectEntityDescription(
+    key="test_select",
+    name="Test Select",
+    json_path="NeoPool.Test.Mode",
+    command="NPTest",
+    options_map={0: "Off", 1: "On"},
+    options=["Off", "On"],
+)
+_NUMBER_DESC_TEST = NeoPoolNumberEntityDescription(
+    key="test_number",
+    name="Test Number",
+    json_path="NeoPool.Test.Value",
+    command="NPTest",
+)
+
+
+class _AsyncRecorder:
+    """Minimal awaitable stand-in that records call arguments."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> None:
+        self.calls.append((args, kwargs))
 
 
 class TestNeoPoolEntityMigration:
@@ -102,671 +157,234 @@ class TestNeoPoolMQTTEntityMigration:
         assert not hasattr(entity, "entity_id") or entity.entity_id is None
 
 
+@MODULE_LOOP
 class TestBinarySensorArrayEdgeCases:
     """Tests for binary sensor array access edge cases."""
 
-    @pytest.mark.asyncio
-    async def test_binary_sensor_array_index_out_of_bounds(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test binary sensor handles array index out of bounds."""
-        desc = NeoPoolBinarySensorEntityDescription(
-            key="relay_state_10",
-            name="Relay State 10",
-            json_path="NeoPool.Relay.State.10",  # Index 10 doesn't exist
-            value_fn=lambda x: bit_to_bool(x)
-            if isinstance(x, (str, int))
-            else (bit_to_bool(x[10]) if isinstance(x, list) and len(x) > 10 else None),
-        )
-
-        sensor = NeoPoolBinarySensor(mock_config_entry, desc)
-        sensor.hass = mock_hass
-        sensor.entity_id = "binary_sensor.relay_state_10"
-        sensor.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await sensor.async_added_to_hass()
-
-        # Array only has 7 elements
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"State": [1, 1, 0, 0, 0, 0, 0]}}})
-        sensor_callback(mock_msg)
-
-        # Should not update state since index is out of bounds
-        assert sensor._attr_is_on is None
-        sensor.async_write_ha_state.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_binary_sensor_array_empty(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test binary sensor handles empty array."""
-        desc = NeoPoolBinarySensorEntityDescription(
-            key="relay_state_0",
-            name="Relay State 0",
-            json_path="NeoPool.Relay.State.0",
-            value_fn=lambda x: bit_to_bool(x)
-            if isinstance(x, (str, int))
-            else (bit_to_bool(x[0]) if isinstance(x, list) and len(x) > 0 else None),
-        )
-
-        sensor = NeoPoolBinarySensor(mock_config_entry, desc)
-        sensor.hass = mock_hass
-        sensor.entity_id = "binary_sensor.relay_state_0"
-        sensor.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await sensor.async_added_to_hass()
-
-        # Empty array
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"State": []}}})
-        sensor_callback(mock_msg)
-
-        # Should not update state since array is empty
-        assert sensor._attr_is_on is None
-        sensor.async_write_ha_state.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_binary_sensor_non_array_path_with_digit(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+    @pytest.mark.parametrize(
+        ("json_path", "payload"),
+        [
+            ("NeoPool.Relay.State.10", _RELAY_STATE_7),  # Array only has 7 elements
+            ("NeoPool.Relay.State.0", _RELAY_STATE_EMPTY),
+            ("NeoPool.Relay.State.1", _RELAY_STATE_SCALAR),  # State is not an array
+        ],
+        ids=["index_out_of_bounds", "empty_array", "non_array_value"],
+    )
+    async def test_binary_sensor_unreachable_array_index(
+        self,
+        mock_config_entry: MagicMock,
+        mqtt_attach: MqttAttach,
+        json_path: str,
+        payload: str,
     ) -> None:
-        """Test binary sensor with path ending in digit but no array."""
+        """Test binary sensor ignores array paths whose index cannot be read."""
         desc = NeoPoolBinarySensorEntityDescription(
-            key="test_sensor",
-            name="Test Sensor",
-            json_path="NeoPool.Relay.State.1",
+            key="relay_state",
+            name="Relay State",
+            json_path=json_path,
         )
 
         sensor = NeoPoolBinarySensor(mock_config_entry, desc)
-        sensor.hass = mock_hass
-        sensor.entity_id = "binary_sensor.test"
-        sensor.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await sensor.async_added_to_hass()
+        sensor_callback = await mqtt_attach(sensor, "binary_sensor.relay_state")
 
-        # State is not an array but a single value
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"State": "not_array"}}})
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=payload))
 
-        # Should not crash, should return early
+        # Should return early without updating state
         assert sensor._attr_is_on is None
+        assert sensor.async_write_ha_state.n == 0
 
-    @pytest.mark.asyncio
     async def test_binary_sensor_invert_with_none_value(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+        self, mock_config_entry: MagicMock, mqtt_attach: MqttAttach
     ) -> None:
         """Test binary sensor inversion doesn't crash on None."""
-        desc = NeoPoolBinarySensorEntityDescription(
-            key="test_sensor",
-            name="Test Sensor",
-            json_path="NeoPool.Test.Value",
+        desc = replace(
+            _BIN_DESC_TEST,
             invert=True,
             value_fn=lambda x: None,  # Always returns None
         )
 
         sensor = NeoPoolBinarySensor(mock_config_entry, desc)
-        sensor.hass = mock_hass
-        sensor.entity_id = "binary_sensor.test"
-        sensor.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
+        sensor_callback = await mqtt_attach(sensor, "binary_sensor.test")
 
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await sensor.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Test": {"Value": 1}}})
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=_TEST_VALUE_1))
 
         # Should set is_on to None (no inversion applied when value_fn returns None)
         assert sensor._attr_is_on is None
 
 
+@MODULE_LOOP
 class TestSwitchArrayEdgeCases:
     """Tests for switch array access edge cases."""
 
-    @pytest.mark.asyncio
-    async def test_switch_aux_array_index_out_of_bounds(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+    @pytest.mark.parametrize(
+        ("json_path", "payload"),
+        [
+            ("NeoPool.Relay.Aux.10", _AUX_4),  # Array only has 4 elements
+            ("NeoPool.Relay.Aux.0", _AUX_EMPTY),
+            ("NeoPool.Relay.Aux.0", _AUX_SCALAR),  # Aux is not an array
+        ],
+        ids=["index_out_of_bounds", "empty_array", "non_array_value"],
+    )
+    async def test_switch_unreachable_aux_index(
+        self,
+        mock_config_entry: MagicMock,
+        mqtt_attach: MqttAttach,
+        json_path: str,
+        payload: str,
     ) -> None:
-        """Test switch handles aux array index out of bounds."""
+        """Test switch ignores aux array paths whose index cannot be read."""
         desc = NeoPoolSwitchEntityDescription(
-            key="aux10",
-            name="AUX10",
-            json_path="NeoPool.Relay.Aux.10",  # Index 10 doesn't exist
-            command="NPAux10",
+            key="aux",
+            name="AUX",
+            json_path=json_path,
+            command="NPAux",
         )
 
         switch = NeoPoolSwitch(mock_config_entry, desc)
-        switch.hass = mock_hass
-        switch.entity_id = "switch.aux10"
-        switch.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await switch.async_added_to_hass()
-
-        # Array only has 4 elements
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"Aux": [1, 0, 0, 0]}}})
-        sensor_callback(mock_msg)
-
-        # Should not update state since index is out of bounds
-        assert switch._attr_is_on is None
-        switch.async_write_ha_state.assert_not_called()
+        sensor_callback = await mqtt_attach(switch, "switch.aux")
 
-    @pytest.mark.asyncio
-    async def test_switch_aux_empty_array(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test switch handles empty aux array."""
-        desc = NeoPoolSwitchEntityDescription(
-            key="aux1",
-            name="AUX1",
-            json_path="NeoPool.Relay.Aux.0",
-            command="NPAux1",
-        )
+        sensor_callback(SimpleNamespace(payload=payload))
 
-        switch = NeoPoolSwitch(mock_config_entry, desc)
-        switch.hass = mock_hass
-        switch.entity_id = "switch.aux1"
-        switch.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await switch.async_added_to_hass()
-
-        # Empty array
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"Aux": []}}})
-        sensor_callback(mock_msg)
-
-        # Should not update state
-        assert switch._attr_is_on is None
-        switch.async_write_ha_state.assert_not_called()
-
-    @pytest.mark.asyncio
-    async def test_switch_non_array_aux_path(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test switch with Aux path but non-array value."""
-        desc = NeoPoolSwitchEntityDescription(
-            key="aux1",
-            name="AUX1",
-            json_path="NeoPool.Relay.Aux.0",
-            command="NPAux1",
-        )
-
-        switch = NeoPoolSwitch(mock_config_entry, desc)
-        switch.hass = mock_hass
-        switch.entity_id = "switch.aux1"
-        switch.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await switch.async_added_to_hass()
-
-        # Aux is not an array
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Relay": {"Aux": "not_array"}}})
-        sensor_callback(mock_msg)
-
-        # Should not crash, should return early
+        # Should return early without updating state
         assert switch._attr_is_on is None
+        assert switch.async_write_ha_state.n == 0
 
 
+@MODULE_LOOP
 class TestSelectEdgeCases:
     """Tests for select entity edge cases."""
 
-    @pytest.mark.asyncio
     async def test_select_with_value_fn_returning_none(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+        self, mock_config_entry: MagicMock, mqtt_attach: MqttAttach
     ) -> None:
         """Test select with value_fn that returns None."""
-        desc = NeoPoolSelectEntityDescription(
-            key="test_select",
-            name="Test Select",
-            json_path="NeoPool.Test.Mode",
-            command="NPTest",
-            options_map={0: "Off", 1: "On"},
-            options=["Off", "On"],
-            value_fn=lambda x: None,  # Always returns None
-        )
+        desc = replace(_SELECT_DESC_TEST, value_fn=lambda x: None)  # Always returns None
 
         select = NeoPoolSelect(mock_config_entry, desc)
-        select.hass = mock_hass
-        select.entity_id = "select.test"
-        select.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
+        sensor_callback = await mqtt_attach(select, "select.test")
 
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await select.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Test": {"Mode": 1}}})
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=_TEST_MODE_1))
 
         # Should not update state when value_fn returns None
         assert select._attr_current_option is None
-        select.async_write_ha_state.assert_not_called()
+        assert select.async_write_ha_state.n == 0
 
-    @pytest.mark.asyncio
     async def test_select_with_invalid_int_value(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+        self, mock_config_entry: MagicMock, mqtt_attach: MqttAttach
     ) -> None:
         """Test select with value that can't be converted to int."""
-        desc = NeoPoolSelectEntityDescription(
-            key="test_select",
-            name="Test Select",
-            json_path="NeoPool.Test.Mode",
-            command="NPTest",
-            options_map={0: "Off", 1: "On"},
-            options=["Off", "On"],
-            # No value_fn, uses default int conversion
-        )
-
-        select = NeoPoolSelect(mock_config_entry, desc)
-        select.hass = mock_hass
-        select.entity_id = "select.test"
-        select.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await select.async_added_to_hass()
+        # No value_fn, uses default int conversion
+        select = NeoPoolSelect(mock_config_entry, _SELECT_DESC_TEST)
+        sensor_callback = await mqtt_attach(select, "select.test")
 
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Test": {"Mode": "invalid"}}})
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=_TEST_MODE_INVALID))
 
         # Should not update state when int conversion fails
         assert select._attr_current_option is None
-        select.async_write_ha_state.assert_not_called()
+        assert select.async_write_ha_state.n == 0
 
-    @pytest.mark.asyncio
     async def test_select_with_value_fn_valid(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+        self, mock_config_entry: MagicMock, mqtt_attach: MqttAttach
     ) -> None:
         """Test select with value_fn that returns valid option."""
-        desc = NeoPoolSelectEntityDescription(
-            key="test_select",
-            name="Test Select",
-            json_path="NeoPool.Test.Mode",
-            command="NPTest",
-            options_map={0: "Off", 1: "On"},
-            options=["Off", "On"],
+        desc = replace(
+            _SELECT_DESC_TEST,
             value_fn=lambda x: "Custom" if x == 99 else ("On" if x == 1 else "Off"),
         )
 
         select = NeoPoolSelect(mock_config_entry, desc)
-        select.hass = mock_hass
-        select.entity_id = "select.test"
-        select.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await select.async_added_to_hass()
+        sensor_callback = await mqtt_attach(select, "select.test")
 
-        mock_msg = MagicMock()
-        mock_msg.payload = json.dumps({"NeoPool": {"Test": {"Mode": 1}}})
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=_TEST_MODE_1))
 
         # Should use value_fn result
         assert select._attr_current_option == "On"
         assert select._attr_available is True
 
 
+@MODULE_LOOP
 class TestNumberEdgeCases:
     """Tests for number entity edge cases."""
 
-    @pytest.mark.asyncio
-    async def test_number_set_value_no_step(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+    @pytest.mark.parametrize(
+        ("step", "value", "expected"),
+        [
+            (None, 7.25, "7.25"),  # No step defined
+            (0.1, 7.35, "7.35"),  # Step < 1
+            (0, 42.5, "42.5"),  # Step is 0 (falsy)
+        ],
+        ids=["no_step", "step_less_than_one", "step_zero"],
+    )
+    async def test_number_set_value_float_format(
+        self,
+        mock_config_entry: MagicMock,
+        mock_hass: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+        step: float | None,
+        value: float,
+        expected: str,
     ) -> None:
-        """Test setting number value when native_step is None."""
-        desc = NeoPoolNumberEntityDescription(
-            key="test_number",
-            name="Test Number",
-            json_path="NeoPool.Test.Value",
-            command="NPTest",
-            native_step=None,  # No step defined
-        )
-
-        number = NeoPoolNumber(mock_config_entry, desc)
+        """Test setting number value publishes float format without an integer step."""
+        number = NeoPoolNumber(mock_config_entry, replace(_NUMBER_DESC_TEST, native_step=step))
         number.hass = mock_hass
 
-        with patch(
-            "homeassistant.components.mqtt.async_publish",
-            new_callable=AsyncMock,
-        ) as mock_publish:
-            await number.async_set_native_value(7.25)
-
-            mock_publish.assert_called_once_with(
-                mock_hass,
-                "cmnd/SmartPool/NPTest",
-                "7.25",  # Float format since no step
-                qos=0,
-                retain=False,
-            )
-
-    @pytest.mark.asyncio
-    async def test_number_set_value_step_less_than_one(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test setting number value with step < 1."""
-        desc = NeoPoolNumberEntityDescription(
-            key="test_number",
-            name="Test Number",
-            json_path="NeoPool.Test.Value",
-            command="NPTest",
-            native_step=0.1,  # Step < 1
-        )
+        publish = _AsyncRecorder()
+        monkeypatch.setattr(mqtt, "async_publish", publish)
 
-        number = NeoPoolNumber(mock_config_entry, desc)
-        number.hass = mock_hass
-
-        with patch(
-            "homeassistant.components.mqtt.async_publish",
-            new_callable=AsyncMock,
-        ) as mock_publish:
-            await number.async_set_native_value(7.35)
-
-            mock_publish.assert_called_once_with(
-                mock_hass,
-                "cmnd/SmartPool/NPTest",
-                "7.35",  # Float format
-                qos=0,
-                retain=False,
-            )
-
-    @pytest.mark.asyncio
-    async def test_number_set_value_step_zero(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test setting number value when step is 0 (falsy)."""
-        desc = NeoPoolNumberEntityDescription(
-            key="test_number",
-            name="Test Number",
-            json_path="NeoPool.Test.Value",
-            command="NPTest",
-            native_step=0,  # Step is 0 (falsy)
-        )
+        await number.async_set_native_value(value)
 
-        number = NeoPoolNumber(mock_config_entry, desc)
-        number.hass = mock_hass
+        assert publish.calls == [
+            ((mock_hass, "cmnd/SmartPool/NPTest", expected), {"qos": 0, "retain": False})
+        ]
 
-        with patch(
-            "homeassistant.components.mqtt.async_publish",
-            new_callable=AsyncMock,
-        ) as mock_publish:
-            await number.async_set_native_value(42.5)
-
-            mock_publish.assert_called_once_with(
-                mock_hass,
-                "cmnd/SmartPool/NPTest",
-                "42.5",  # Float format since step is falsy
-                qos=0,
-                retain=False,
-            )
-
-    @pytest.mark.asyncio
     async def test_number_handles_invalid_json(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+        self, mock_config_entry: MagicMock, mqtt_attach: MqttAttach
     ) -> None:
         """Test number handles invalid JSON payload."""
-        desc = NeoPoolNumberEntityDescription(
-            key="test_number",
-            name="Test Number",
-            json_path="NeoPool.Test.Value",
-            command="NPTest",
-        )
-
-        number = NeoPoolNumber(mock_config_entry, desc)
-        number.hass = mock_hass
-        number.entity_id = "number.test"
-        number.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
+        number = NeoPoolNumber(mock_config_entry, _NUMBER_DESC_TEST)
+        sensor_callback = await mqtt_attach(number, "number.test")
 
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await number.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = "not valid json"
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=_INVALID_JSON))
 
         # Should not crash, should return early
         assert number._attr_native_value is None
-        number.async_write_ha_state.assert_not_called()
+        assert number.async_write_ha_state.n == 0
 
 
+@MODULE_LOOP
 class TestMqttEntityInvalidPayloads:
     """Tests for MQTT entities handling invalid payloads."""
 
-    @pytest.mark.asyncio
-    async def test_binary_sensor_invalid_json(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
+    @pytest.mark.parametrize(
+        ("entity_cls", "desc", "entity_id", "payload", "attr"),
+        [
+            (
+                NeoPoolBinarySensor,
+                _BIN_DESC_TEST,
+                "binary_sensor.test",
+                _INVALID_JSON_BRACES,
+                "_attr_is_on",
+            ),
+            (NeoPoolSwitch, _SWITCH_DESC_TEST, "switch.test", _NOT_JSON, "_attr_is_on"),
+            (NeoPoolSelect, _SELECT_DESC_TEST, "select.test", _NOT_JSON, "_attr_current_option"),
+        ],
+        ids=["binary_sensor", "switch", "select"],
+    )
+    async def test_invalid_json(
+        self,
+        mock_config_entry: MagicMock,
+        mqtt_attach: MqttAttach,
+        entity_cls: type[NeoPoolMQTTEntity],
+        desc: Any,
+        entity_id: str,
+        payload: str,
+        attr: str,
     ) -> None:
-        """Test binary sensor handles invalid JSON."""
-        desc = NeoPoolBinarySensorEntityDescription(
-            key="test_sensor",
-            name="Test Sensor",
-            json_path="NeoPool.Test.Value",
-        )
-
-        sensor = NeoPoolBinarySensor(mock_config_entry, desc)
-        sensor.hass = mock_hass
-        sensor.entity_id = "binary_sensor.test"
-        sensor.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
+        """Test MQTT entities handle invalid JSON."""
+        entity = entity_cls(mock_config_entry, desc)
+        sensor_callback = await mqtt_attach(entity, entity_id)
 
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await sensor.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = "invalid json {{"
-        sensor_callback(mock_msg)
-
-        # Should not crash
-        assert sensor._attr_is_on is None
-
-    @pytest.mark.asyncio
-    async def test_switch_invalid_json(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test switch handles invalid JSON."""
-        desc = NeoPoolSwitchEntityDescription(
-            key="test_switch",
-            name="Test Switch",
-            json_path="NeoPool.Test.State",
-            command="NPTest",
-        )
-
-        switch = NeoPoolSwitch(mock_config_entry, desc)
-        switch.hass = mock_hass
-        switch.entity_id = "switch.test"
-        switch.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await switch.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = "not json"
-        sensor_callback(mock_msg)
+        sensor_callback(SimpleNamespace(payload=payload))
 
         # Should not crash
-        assert switch._attr_is_on is None
-
-    @pytest.mark.asyncio
-    async def test_select_invalid_json(
-        self, mock_config_entry: MagicMock, mock_hass: MagicMock
-    ) -> None:
-        """Test select handles invalid JSON."""
-        desc = NeoPoolSelectEntityDescription(
-            key="test_select",
-            name="Test Select",
-            json_path="NeoPool.Test.Mode",
-            command="NPTest",
-            options_map={0: "Off", 1: "On"},
-            options=["Off", "On"],
-        )
-
-        select = NeoPoolSelect(mock_config_entry, desc)
-        select.hass = mock_hass
-        select.entity_id = "select.test"
-        select.async_write_ha_state = MagicMock()
-
-        sensor_callback = None
-
-        async def capture_callback(hass, topic, callback, **kwargs):
-            nonlocal sensor_callback
-            if "SENSOR" in topic:
-                sensor_callback = callback
-            return MagicMock()
-
-        with patch(
-            "homeassistant.components.mqtt.async_subscribe",
-            side_effect=capture_callback,
-        ):
-            await select.async_added_to_hass()
-
-        mock_msg = MagicMock()
-        mock_msg.payload = "not json"
-        sensor_callback(mock_msg)
-
-        # Should not crash
-        assert select._attr_current_option is None
+        assert getattr(entity, attr) is None
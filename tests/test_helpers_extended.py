@@ -2,7 +2,13 @@
 
 from __future__ import annotations
 
+from typing import Any
+
+import pytest
+
 from custom_components.sugar_valley_neopool.helpers import (
+    _parse_runtime_duration,
+    _path_cache,
     bit_to_bool,
     clamp,
     get_nested_value,
@@ -15,6 +21,11 @@ from custom_components.sugar_valley_neopool.helpers import (
     validate_nodeid,
 )
 
+from .conftest import SAMPLE_JSON_BYTEARRAY, SAMPLE_JSON_INVALID_UTF8
+
+# Encoded parse_json_payload input, built once at import
+_JSON_UNICODE = '{"name": "Café"}'.encode()
+
 
 class TestGetNestedValueExtended:
     """Extended tests for get_nested_value function."""
@@ -41,15 +52,19 @@ class TestGetNestedValueExtended:
         data = {"key": 123}  # int, not dict or list
         assert get_nested_value(data, "key.subkey") is None
 
-    def test_single_key_path(self) -> None:
-        """Test path with single key."""
-        data = {"single": "value"}
-        assert get_nested_value(data, "single") == "value"
+    def test_repeated_path_uses_cache(self) -> None:
+        """Test repeated lookups of the same path reuse the parsed segments."""
+        data = {"NeoPool": {"Relay": {"State": [1, 0, 1]}}}
+        assert get_nested_value(data, "NeoPool.Relay.State.2") == 1
+        segments = _path_cache["NeoPool.Relay.State.2"]
+
+        assert get_nested_value(data, "NeoPool.Relay.State.2") == 1
+        assert _path_cache["NeoPool.Relay.State.2"] is segments
 
-    def test_empty_path_segment(self) -> None:
-        """Test path behavior."""
-        data = {"a": {"b": "value"}}
-        assert get_nested_value(data, "a.b") == "value"
+    def test_numeric_dict_key(self) -> None:
+        """Test numeric segments still index dicts by string key."""
+        data = {"Relay": {"0": "first"}}
+        assert get_nested_value(data, "Relay.0") == "first"
 
 
 class TestParseRuntimeDurationExtended:
@@ -81,19 +96,28 @@ class TestParseRuntimeDurationExtended:
         """Test with non-numeric time components."""
         assert parse_runtime_duration("10Tab:30:00") is None
 
+    def test_repeated_input_is_cached(self) -> None:
+        """Test repeated runtime strings are served from the cache."""
+        _parse_runtime_duration.cache_clear()
+        assert parse_runtime_duration("10T12:30:45") == 252.51
+        assert parse_runtime_duration("10T12:30:45") == 252.51
+        assert _parse_runtime_duration.cache_info().hits == 1
+
+    def test_non_string_input(self) -> None:
+        """Test unhashable non-string input returns None instead of raising."""
+        assert parse_runtime_duration(["10T12:30:45"]) is None  # type: ignore[arg-type]
+
 
 class TestParseJsonPayloadExtended:
     """Extended tests for parse_json_payload function."""
 
     def test_bytearray_input(self) -> None:
         """Test with bytearray input."""
-        result = parse_json_payload(bytearray(b'{"key": "value"}'))
-        assert result == {"key": "value"}
+        assert parse_json_payload(SAMPLE_JSON_BYTEARRAY) == {"key": "value"}
 
     def test_bytes_with_unicode(self) -> None:
         """Test bytes with unicode characters."""
-        result = parse_json_payload('{"name": "Café"}'.encode())
-        assert result == {"name": "Café"}
+        assert parse_json_payload(_JSON_UNICODE) == {"name": "Café"}
 
     def test_complex_nested_json(self) -> None:
         """Test complex nested JSON structure."""
@@ -115,9 +139,7 @@ class TestParseJsonPayloadExtended:
 
     def test_unicode_decode_error(self) -> None:
         """Test handling of invalid UTF-8 bytes."""
-        # Invalid UTF-8 sequence
-        result = parse_json_payload(b"\xff\xfe")
-        assert result is None
+        assert parse_json_payload(SAMPLE_JSON_INVALID_UTF8) is None
 
     def test_truncated_json(self) -> None:
         """Test truncated JSON."""
@@ -148,123 +170,132 @@ class TestLookupByValueExtended:
 class TestBitToBoolExtended:
     """Extended tests for bit_to_bool function."""
 
-    def test_none_input(self) -> None:
-        """Test None input."""
-        assert bit_to_bool(None) is None
-
-    def test_boolean_input(self) -> None:
-        """Test boolean input - Python True == 1 and False == 0."""
-        # In Python, True == 1 is True, so bit_to_bool(True) returns True
-        assert bit_to_bool(True) is True
-        # In Python, False == 0 is True, so bit_to_bool(False) returns False
-        assert bit_to_bool(False) is False
-
-    def test_float_input(self) -> None:
-        """Test float input - Python 1.0 == 1 and 0.0 == 0."""
-        # In Python, 1.0 == 1 is True, so bit_to_bool(1.0) returns True
-        assert bit_to_bool(1.0) is True
-        # In Python, 0.0 == 0 is True, so bit_to_bool(0.0) returns False
-        assert bit_to_bool(0.0) is False
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            (None, None),
+            # Python True == 1 and False == 0
+            (True, True),
+            (False, False),
+            # Python 1.0 == 1 and 0.0 == 0
+            (1.0, True),
+            (0.0, False),
+        ],
+        ids=["none", "true", "false", "float_one", "float_zero"],
+    )
+    def test_bit_to_bool(self, value: Any, expected: bool | None) -> None:
+        """Test bit_to_bool with non-integer inputs."""
+        assert bit_to_bool(value) is expected
 
 
 class TestIntToBoolExtended:
     """Extended tests for int_to_bool function."""
 
-    def test_float_string(self) -> None:
-        """Test float string input - int('3.7') raises ValueError."""
-        # int("3.7") raises ValueError, so int_to_bool returns False
-        assert int_to_bool("3.7") is False
-
-    def test_empty_string(self) -> None:
-        """Test empty string."""
-        assert int_to_bool("") is False
-
-    def test_whitespace_string(self) -> None:
-        """Test whitespace string."""
-        assert int_to_bool("  ") is False
-
-    def test_large_positive(self) -> None:
-        """Test large positive number."""
-        assert int_to_bool(1000000) is True
-
-    def test_large_negative(self) -> None:
-        """Test large negative number."""
-        assert int_to_bool(-1000000) is False
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("3.7", False),  # int("3.7") raises ValueError
+            ("", False),
+            ("  ", False),
+            (1000000, True),
+            (-1000000, False),
+        ],
+        ids=[
+            "float_string",
+            "empty_string",
+            "whitespace_string",
+            "large_positive",
+            "large_negative",
+        ],
+    )
+    def test_int_to_bool(self, value: Any, expected: bool) -> None:
+        """Test int_to_bool with edge-case inputs."""
+        assert int_to_bool(value) is expected
 
 
 class TestSafeFloatExtended:
     """Extended tests for safe_float function."""
 
-    def test_negative_float(self) -> None:
-        """Test negative float."""
-        assert safe_float(-3.14) == -3.14
-
-    def test_scientific_notation_string(self) -> None:
-        """Test scientific notation string."""
-        assert safe_float("1e5") == 100000.0
-
-    def test_empty_string(self) -> None:
-        """Test empty string returns default."""
-        assert safe_float("", 0.0) == 0.0
-
-    def test_whitespace_string(self) -> None:
-        """Test whitespace string."""
-        assert safe_float("   ", 0.0) == 0.0
-
-    def test_boolean_input(self) -> None:
-        """Test boolean input."""
-        assert safe_float(True) == 1.0
-        assert safe_float(False) == 0.0
-
-    def test_list_input(self) -> None:
-        """Test list input returns default."""
-        assert safe_float([1, 2, 3]) is None
-        assert safe_float([1, 2, 3], -1.0) == -1.0
+    @pytest.mark.parametrize(
+        ("args", "expected"),
+        [
+            ((-3.14,), -3.14),
+            (("1e5",), 100000.0),
+            (("", 0.0), 0.0),
+            (("   ", 0.0), 0.0),
+            ((True,), 1.0),
+            ((False,), 0.0),
+            (([1, 2, 3],), None),
+            (([1, 2, 3], -1.0), -1.0),
+        ],
+        ids=[
+            "negative_float",
+            "scientific_notation_string",
+            "empty_string",
+            "whitespace_string",
+            "true",
+            "false",
+            "list",
+            "list_with_default",
+        ],
+    )
+    def test_safe_float(self, args: tuple[Any, ...], expected: float | None) -> None:
+        """Test safe_float conversion and default fallback."""
+        assert safe_float(*args) == expected
 
 
 class TestSafeIntExtended:
     """Extended tests for safe_int function."""
 
-    def test_negative_float(self) -> None:
-        """Test negative float truncation."""
-        assert safe_int(-3.7) == -3
-
-    def test_scientific_notation(self) -> None:
-        """Test scientific notation."""
-        assert safe_int("1e2") == 100
-
-    def test_boolean_input(self) -> None:
-        """Test boolean input."""
-        assert safe_int(True) == 1
-        assert safe_int(False) == 0
-
-    def test_negative_string(self) -> None:
-        """Test negative number string."""
-        assert safe_int("-42") == -42
-
-    def test_dict_input(self) -> None:
-        """Test dict input returns default."""
-        assert safe_int({}) is None
-        assert safe_int({}, 0) == 0
+    @pytest.mark.parametrize(
+        ("args", "expected"),
+        [
+            ((-3.7,), -3),  # Truncation
+            (("1e2",), 100),
+            ((True,), 1),
+            ((False,), 0),
+            (("-42",), -42),
+            (({},), None),
+            (({}, 0), 0),
+        ],
+        ids=[
+            "negative_float",
+            "scientific_notation",
+            "true",
+            "false",
+            "negative_string",
+            "dict",
+            "dict_with_default",
+        ],
+    )
+    def test_safe_int(self, args: tuple[Any, ...], expected: int | None) -> None:
+        """Test safe_int conversion and default fallback."""
+        assert safe_int(*args) == expected
 
 
 class TestClampExtended:
     """Extended tests for clamp function."""
 
-    def test_negative_range(self) -> None:
-        """Test with negative range."""
-        assert clamp(-5.0, -10.0, -1.0) == -5.0
-        assert clamp(-15.0, -10.0, -1.0) == -10.0
-
-    def test_zero_range(self) -> None:
-        """Test with min equals max."""
-        assert clamp(5.0, 3.0, 3.0) == 3.0
-        assert clamp(1.0, 3.0, 3.0) == 3.0
-
-    def test_float_precision(self) -> None:
-        """Test float precision is maintained."""
-        result = clamp(3.14159, 0.0, 10.0)
-        assert result == 3.14159
+    @pytest.mark.parametrize(
+        ("value", "min_val", "max_val", "expected"),
+        [
+            (-5.0, -10.0, -1.0, -5.0),
+            (-15.0, -10.0, -1.0, -10.0),
+            (5.0, 3.0, 3.0, 3.0),  # min equals max
+            (1.0, 3.0, 3.0, 3.0),
+            (3.14159, 0.0, 10.0, 3.14159),  # Float precision is maintained
+        ],
+        ids=[
+            "negative_range",
+            "negative_range_below",
+            "zero_range_above",
+            "zero_range_below",
+            "float_precision",
+        ],
+    )
+    def test_clamp(self, value: float, min_val: float, max_val: float, expected: float) -> None:
+        """Test clamp keeps values within bounds."""
+        assert clamp(value, min_val, max_val) == expected
 
 
 class TestValidateNodeidExtended:
@@ -278,6 +309,10 @@ class TestValidateNodeidExtended:
         """Test various cases of 'hidden'."""
         assert validate_nodeid("HiDdEn") is False
 
+    def test_mixed_case_hidden_by_default(self) -> None:
+        """Test mixed case 'hidden_by_default' is rejected."""
+        assert validate_nodeid("Hidden_By_Default") is False
+
     def test_whitespace_nodeid(self) -> None:
         """Test NodeID with whitespace."""
         # Whitespace-only string should be valid (not explicitly filtered)
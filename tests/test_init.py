@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock, MagicMock, patch
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from pytest_homeassistant_custom_component.common import MockConfigEntry
@@ -32,50 +35,43 @@ from custom_components.sugar_valley_neopool.const import (
     DEFAULT_RECOVERY_SCRIPT,
     DOMAIN,
 )
+from homeassistant.components import mqtt
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr
 
+from .conftest import MakeEntry, attr_swap
+
+# Options added by the version 1 -> 2 migration
+_MIGRATED_DEFAULTS: dict[str, Any] = {
+    CONF_ENABLE_REPAIR_NOTIFICATION: DEFAULT_ENABLE_REPAIR_NOTIFICATION,
+    CONF_FAILURES_THRESHOLD: DEFAULT_FAILURES_THRESHOLD,
+    CONF_RECOVERY_SCRIPT: DEFAULT_RECOVERY_SCRIPT,
+    CONF_OFFLINE_TIMEOUT: DEFAULT_OFFLINE_TIMEOUT,
+}
+
+# Device registry identifiers for the sample NodeID
+_IDENTIFIERS_ABC = {(DOMAIN, "ABC123")}
+
+# Runtime data matching SAMPLE_ENTRY_DATA, copied per test via _runtime_data()
+_RUNTIME_TEMPLATE = NeoPoolData(device_name="Test Pool", mqtt_topic="SmartPool", nodeid="ABC123")
+
+
+def _runtime_data(**changes: Any) -> NeoPoolData:
+    """Copy the runtime data template with fresh mutable containers."""
+    return replace(_RUNTIME_TEMPLATE, sensor_data={}, entity_id_mapping={}, **changes)
+
 
 class TestAsyncSetupEntry:
     """Tests for async_setup_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_success(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_success(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test successful setup entry."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry()
 
-        with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-        ):
-            result = await async_setup_entry(hass, entry)
+        result = await async_setup_entry(hass, entry)
 
         assert result is True
         assert entry.runtime_data is not None
@@ -83,63 +79,25 @@ class TestAsyncSetupEntry:
         assert entry.runtime_data.mqtt_topic == "SmartPool"
         assert entry.runtime_data.nodeid == "ABC123"
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_mqtt_not_available(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_mqtt_not_available(
+        self, hass: HomeAssistant, make_entry: MakeEntry
+    ) -> None:
         """Test setup fails when MQTT is not available."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry()
 
         with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=False,
-            ),
+            patch.object(mqtt, "async_wait_for_mqtt_client", return_value=False),
             pytest.raises(ConfigEntryNotReady),
         ):
             await async_setup_entry(hass, entry)
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_uses_default_name(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_uses_default_name(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test setup uses default name when not provided."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry(data={CONF_DISCOVERY_PREFIX: "SmartPool", CONF_NODEID: "ABC123"})
 
-        with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-        ):
-            await async_setup_entry(hass, entry)
+        await async_setup_entry(hass, entry)
 
         assert entry.runtime_data.device_name == DEFAULT_DEVICE_NAME
 
@@ -147,48 +105,24 @@ class TestAsyncSetupEntry:
 class TestAsyncUnloadEntry:
     """Tests for async_unload_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_unload_entry_success(self, hass: HomeAssistant) -> None:
+    async def test_unload_entry_success(self, hass: HomeAssistant, make_entry: MakeEntry) -> None:
         """Test successful unload entry."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
+        entry = make_entry()
+        entry.runtime_data = _runtime_data()
 
-        with patch.object(hass.config_entries, "async_unload_platforms", return_value=True):
+        with attr_swap(hass.config_entries, "async_unload_platforms", AsyncMock(return_value=True)):
             result = await async_unload_entry(hass, entry)
 
         assert result is True
 
-    @pytest.mark.asyncio
-    async def test_unload_entry_failure(self, hass: HomeAssistant) -> None:
+    async def test_unload_entry_failure(self, hass: HomeAssistant, make_entry: MakeEntry) -> None:
         """Test unload entry returns False on failure."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
+        entry = make_entry()
+        entry.runtime_data = _runtime_data()
 
-        with patch.object(hass.config_entries, "async_unload_platforms", return_value=False):
+        with attr_swap(
+            hass.config_entries, "async_unload_platforms", AsyncMock(return_value=False)
+        ):
             result = await async_unload_entry(hass, entry)
 
         assert result is False
@@ -197,72 +131,34 @@ class TestAsyncUnloadEntry:
 class TestAsyncMigrateEntry:
     """Tests for async_migrate_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_migrate_from_v1_to_v2(self, hass: HomeAssistant) -> None:
-        """Test migration from version 1 to 2."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=1,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-            options={},
-        )
-        entry.add_to_hass(hass)
+    @pytest.mark.parametrize(
+        ("options", "expected"),
+        [
+            ({}, _MIGRATED_DEFAULTS),
+            ({"existing_option": "value"}, {**_MIGRATED_DEFAULTS, "existing_option": "value"}),
+            ({CONF_FAILURES_THRESHOLD: 7}, {**_MIGRATED_DEFAULTS, CONF_FAILURES_THRESHOLD: 7}),
+        ],
+        ids=["sets_defaults", "preserves_existing_options", "keeps_configured_value"],
+    )
+    async def test_migrate_from_v1_to_v2(
+        self,
+        hass: HomeAssistant,
+        make_entry: MakeEntry,
+        options: dict[str, Any],
+        expected: dict[str, Any],
+    ) -> None:
+        """Test migration from version 1 to 2 fills in missing option defaults."""
+        entry = make_entry(version=1, options=options)
 
         result = await async_migrate_entry(hass, entry)
 
         assert result is True
         assert entry.version == CONFIG_ENTRY_VERSION
-        assert CONF_ENABLE_REPAIR_NOTIFICATION in entry.options
-        assert CONF_FAILURES_THRESHOLD in entry.options
-        assert CONF_RECOVERY_SCRIPT in entry.options
-        assert CONF_OFFLINE_TIMEOUT in entry.options
-
-    @pytest.mark.asyncio
-    async def test_migrate_preserves_existing_options(self, hass: HomeAssistant) -> None:
-        """Test migration preserves existing options."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=1,
-            data={CONF_DEVICE_NAME: "Pool"},
-            options={"existing_option": "value"},
-        )
-        entry.add_to_hass(hass)
-
-        await async_migrate_entry(hass, entry)
+        assert entry.options == expected
 
-        assert entry.options["existing_option"] == "value"
-
-    @pytest.mark.asyncio
-    async def test_migrate_sets_defaults(self, hass: HomeAssistant) -> None:
-        """Test migration sets default values."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=1,
-            data={CONF_DEVICE_NAME: "Pool"},
-            options={},
-        )
-        entry.add_to_hass(hass)
-
-        await async_migrate_entry(hass, entry)
-
-        assert entry.options[CONF_ENABLE_REPAIR_NOTIFICATION] == DEFAULT_ENABLE_REPAIR_NOTIFICATION
-        assert entry.options[CONF_FAILURES_THRESHOLD] == DEFAULT_FAILURES_THRESHOLD
-        assert entry.options[CONF_RECOVERY_SCRIPT] == DEFAULT_RECOVERY_SCRIPT
-        assert entry.options[CONF_OFFLINE_TIMEOUT] == DEFAULT_OFFLINE_TIMEOUT
-
-    @pytest.mark.asyncio
-    async def test_no_downgrade(self, hass: HomeAssistant) -> None:
+    async def test_no_downgrade(self, hass: HomeAssistant, make_entry: MakeEntry) -> None:
         """Test migration fails for future version."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=CONFIG_ENTRY_VERSION + 1,
-            data={CONF_DEVICE_NAME: "Pool"},
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry(version=CONFIG_ENTRY_VERSION + 1)
 
         result = await async_migrate_entry(hass, entry)
 
@@ -272,48 +168,32 @@ class TestAsyncMigrateEntry:
 class TestAsyncRegisterDevice:
     """Tests for async_register_device function."""
 
-    @pytest.mark.asyncio
-    async def test_register_device(self, hass: HomeAssistant) -> None:
+    async def test_register_device(self, hass: HomeAssistant, make_entry: MakeEntry) -> None:
         """Test device registration."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
+        entry = make_entry()
+        entry.runtime_data = _runtime_data()
 
         await async_register_device(hass, entry)
 
         device_registry = dr.async_get(hass)
-        device = device_registry.async_get_device(identifiers={(DOMAIN, "ABC123")})
+        device = device_registry.async_get_device(identifiers=_IDENTIFIERS_ABC)
 
         assert device is not None
         assert device.name == "Test Pool"
 
-    @pytest.mark.asyncio
-    async def test_register_device_stores_device_id(self, hass: HomeAssistant) -> None:
+    async def test_register_device_stores_device_id(
+        self, hass: HomeAssistant, make_entry: MakeEntry
+    ) -> None:
         """Test device registration stores device_id in runtime_data."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
+        entry = make_entry(
             data={
                 CONF_DEVICE_NAME: "My Pool",
                 CONF_DISCOVERY_PREFIX: "PoolTopic",
                 CONF_NODEID: "XYZ789",
-            },
+            }
         )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="My Pool",
-            mqtt_topic="PoolTopic",
-            nodeid="XYZ789",
+        entry.runtime_data = _runtime_data(
+            device_name="My Pool", mqtt_topic="PoolTopic", nodeid="XYZ789"
         )
 
         await async_register_device(hass, entry)
@@ -324,14 +204,13 @@ class TestAsyncRegisterDevice:
 class TestAsyncRemoveConfigEntryDevice:
     """Tests for async_remove_config_entry_device function."""
 
-    @pytest.mark.asyncio
-    async def test_remove_device_returns_false(self, hass: HomeAssistant) -> None:
+    async def test_remove_device_returns_false(self) -> None:
         """Test remove device always returns False."""
         entry = MockConfigEntry(domain=DOMAIN, data={})
-        device = MagicMock()
-        device.identifiers = {(DOMAIN, "ABC123")}
+        device = SimpleNamespace(identifiers=_IDENTIFIERS_ABC)
 
-        result = await async_remove_config_entry_device(hass, entry, device)
+        # The handler never touches hass, so no instance is needed
+        result = await async_remove_config_entry_device(None, entry, device)  # type: ignore[arg-type]
 
         assert result is False
 
@@ -339,92 +218,67 @@ class TestAsyncRemoveConfigEntryDevice:
 class TestGetDeviceInfo:
     """Tests for get_device_info function."""
 
-    def test_get_device_info(self) -> None:
-        """Test getting device info without runtime_data."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-
-        device_info = get_device_info(entry)
-
-        assert device_info["identifiers"] == {(DOMAIN, "ABC123")}
-        assert device_info["name"] == "Test Pool"
-        # sw_version is None when no runtime_data with fw_version
-        assert device_info["sw_version"] is None
-
-    def test_get_device_info_with_runtime_data(self) -> None:
-        """Test getting device info with runtime_data containing fw_version."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        # Set up runtime_data with manufacturer and fw_version
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-            manufacturer="Bayrol",
-            fw_version="V6.0.0",
-        )
-
-        device_info = get_device_info(entry)
-
-        assert device_info["identifiers"] == {(DOMAIN, "ABC123")}
-        assert device_info["name"] == "Test Pool"
-        assert device_info["manufacturer"] == "Bayrol"
-        assert device_info["sw_version"] == "V6.0.0 (Powerunit)"
-
-    def test_get_device_info_default_name(self) -> None:
-        """Test device info uses default name."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_NODEID: "ABC123",
-            },
-        )
+    @pytest.mark.parametrize(
+        ("data", "runtime", "expected"),
+        [
+            (
+                {CONF_DEVICE_NAME: "Test Pool", CONF_NODEID: "ABC123"},
+                None,
+                # sw_version is None when no runtime_data with fw_version
+                {"identifiers": _IDENTIFIERS_ABC, "name": "Test Pool", "sw_version": None},
+            ),
+            (
+                {CONF_DEVICE_NAME: "Test Pool", CONF_NODEID: "ABC123"},
+                {"manufacturer": "Bayrol", "fw_version": "V6.0.0"},
+                {
+                    "identifiers": _IDENTIFIERS_ABC,
+                    "name": "Test Pool",
+                    "manufacturer": "Bayrol",
+                    "sw_version": "V6.0.0 (Powerunit)",
+                },
+            ),
+            ({CONF_NODEID: "ABC123"}, None, {"name": DEFAULT_DEVICE_NAME}),
+        ],
+        ids=["without_runtime_data", "with_runtime_data", "default_name"],
+    )
+    def test_get_device_info(
+        self,
+        data: dict[str, Any],
+        runtime: dict[str, Any] | None,
+        expected: dict[str, Any],
+    ) -> None:
+        """Test device info is built from entry data and optional runtime_data."""
+        entry = MockConfigEntry(domain=DOMAIN, data=data)
+        if runtime is not None:
+            entry.runtime_data = _runtime_data(**runtime)
 
         device_info = get_device_info(entry)
 
-        assert device_info["name"] == DEFAULT_DEVICE_NAME
+        assert {key: device_info[key] for key in expected} == expected
 
 
 class TestNeoPoolData:
     """Tests for NeoPoolData dataclass."""
 
-    def test_default_values(self) -> None:
-        """Test default values."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-        )
+    @pytest.mark.parametrize(
+        ("extra", "expected"),
+        [
+            ({}, {"sensor_data": {}, "available": False, "device_id": None}),
+            (
+                {"sensor_data": {"temp": 28.5}, "available": True},
+                {"sensor_data": {"temp": 28.5}, "available": True},
+            ),
+        ],
+        ids=["default_values", "with_sensor_data"],
+    )
+    def test_fields(self, extra: dict[str, Any], expected: dict[str, Any]) -> None:
+        """Test required fields are stored and optional fields default or override."""
+        data = NeoPoolData(device_name="Pool", mqtt_topic="Topic", nodeid="123", **extra)
 
         assert data.device_name == "Pool"
         assert data.mqtt_topic == "Topic"
         assert data.nodeid == "123"
-        assert data.sensor_data == {}
-        assert data.available is False
-        assert data.device_id is None
-
-    def test_with_sensor_data(self) -> None:
-        """Test with sensor data."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-            sensor_data={"temp": 28.5},
-            available=True,
-        )
-
-        assert data.sensor_data == {"temp": 28.5}
-        assert data.available is True
+        assert {name: getattr(data, name) for name in expected} == expected
 
 
 class TestConfigEntryVersion:
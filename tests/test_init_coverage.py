@@ -10,10 +10,11 @@ from __future__ import annotations
 
 import asyncio
 import json
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.sugar_valley_neopool import (
     NeoPoolData,
@@ -22,266 +23,177 @@ from custom_components.sugar_valley_neopool import (
     async_migrate_masked_unique_ids,
     async_setup_entry,
 )
-from custom_components.sugar_valley_neopool.const import (
-    CONF_DEVICE_NAME,
-    CONF_DISCOVERY_PREFIX,
-    CONF_NODEID,
-    DOMAIN,
-)
+from custom_components.sugar_valley_neopool.const import CONF_NODEID, DOMAIN
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import device_registry as dr, entity_registry as er
 
+from .conftest import SAMPLE_ENTRY_DATA, MakeEntry
+
+if TYPE_CHECKING:
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+# NodeID as reported by Tasmota while SetOption157 is disabled
+_MASKED_NODEID = "XXXX XXXX XXXX XXXX XXXX 3435"
+
+
+@pytest.fixture
+def valid_entry(make_entry: MakeEntry) -> MockConfigEntry:
+    """Return a config entry with a real NodeID and matching runtime_data."""
+    entry = make_entry()
+    entry.runtime_data = NeoPoolData(
+        device_name="Test Pool", mqtt_topic="SmartPool", nodeid="ABC123"
+    )
+    return entry
+
+
+@pytest.fixture
+def masked_entry(make_entry: MakeEntry) -> MockConfigEntry:
+    """Return a config entry whose NodeID is masked, with matching runtime_data."""
+    entry = make_entry(data={**SAMPLE_ENTRY_DATA, CONF_NODEID: _MASKED_NODEID})
+    entry.runtime_data = NeoPoolData(
+        device_name="Test Pool", mqtt_topic="SmartPool", nodeid=_MASKED_NODEID
+    )
+    return entry
+
 
 class TestApplyEntityIdMapping:
     """Tests for _apply_entity_id_mapping function."""
 
-    @pytest.mark.asyncio
-    async def test_empty_mapping_does_nothing(self, hass: HomeAssistant) -> None:
+    async def test_empty_mapping_does_nothing(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test empty mapping doesn't modify anything."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Should complete without error
-        await _apply_entity_id_mapping(hass, entry, {})
+        _apply_entity_id_mapping(hass, valid_entry, {})
 
-    @pytest.mark.asyncio
-    async def test_mapping_with_full_entity_id_format(self, hass: HomeAssistant) -> None:
+    async def test_mapping_with_full_entity_id_format(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test mapping using full entity_id format (domain.object_id)."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Create a mock entity in the registry
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_ph_data",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_ph_data",
         )
 
         mapping = {"ph_data": "sensor.neopool_mqtt_ph_data"}
 
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Verify the entity was renamed
         updated_entity = entity_registry.async_get("sensor.neopool_mqtt_ph_data")
         assert updated_entity is not None
 
-    @pytest.mark.asyncio
-    async def test_mapping_with_object_id_only_format(self, hass: HomeAssistant) -> None:
+    async def test_mapping_with_object_id_only_format(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test mapping using object_id only format (backwards compatibility)."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Create a mock entity
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_water_temperature",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_water_temp",
         )
 
         # Old format: just object_id without domain
         mapping = {"water_temperature": "neopool_yaml_temperature"}
 
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Verify entity was renamed
         updated_entity = entity_registry.async_get("sensor.neopool_yaml_temperature")
         assert updated_entity is not None
 
-    @pytest.mark.asyncio
-    async def test_mapping_entity_not_found(self, hass: HomeAssistant) -> None:
+    async def test_mapping_entity_not_found(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test mapping when entity doesn't exist."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # No entities created - mapping should handle gracefully
         mapping = {"nonexistent_entity": "sensor.should_not_crash"}
 
         # Should complete without error
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
-    @pytest.mark.asyncio
-    async def test_mapping_yaml_key_translation(self, hass: HomeAssistant) -> None:
+    async def test_mapping_yaml_key_translation(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test YAML key to integration key translation."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Create entity with integration key
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="switch",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_filtration",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_filtration",
         )
 
         # YAML uses "filtration_switch" which maps to "filtration"
         mapping = {"filtration_switch": "switch.neopool_yaml_filtration"}
 
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Entity should be renamed
         updated_entity = entity_registry.async_get("switch.neopool_yaml_filtration")
         assert updated_entity is not None
 
-    @pytest.mark.asyncio
-    async def test_mapping_cross_domain_skipped(self, hass: HomeAssistant) -> None:
+    async def test_mapping_cross_domain_skipped(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test cross-domain mapping is skipped (HA doesn't allow)."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Create a sensor entity
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_ph_data",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_ph",
         )
 
         # Try to rename sensor to switch domain - should be skipped
         mapping = {"ph_data": "switch.neopool_ph_switch"}
 
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Original entity should still exist unchanged
         original = entity_registry.async_get("sensor.neopool_ph")
         assert original is not None
 
-    @pytest.mark.asyncio
-    async def test_mapping_already_correct_entity_id(self, hass: HomeAssistant) -> None:
+    async def test_mapping_already_correct_entity_id(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test mapping skips entity with already correct ID."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         # Create entity with already correct ID
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_temperature",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_mqtt_temperature",
         )
 
         # Mapping points to same ID it already has
         mapping = {"temperature": "sensor.neopool_mqtt_temperature"}
 
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Entity should still exist
         entity = entity_registry.async_get("sensor.neopool_mqtt_temperature")
         assert entity is not None
 
-    @pytest.mark.asyncio
-    async def test_mapping_target_already_exists(self, hass: HomeAssistant) -> None:
+    async def test_mapping_target_already_exists(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test mapping when target entity_id already exists."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
         entity_registry = er.async_get(hass)
 
         # Create source entity
@@ -289,7 +201,7 @@ class TestApplyEntityIdMapping:
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_ph_data",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_ph_new",
         )
 
@@ -298,7 +210,7 @@ class TestApplyEntityIdMapping:
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_ABC123_other",
-            config_entry=entry,
+            config_entry=valid_entry,
             suggested_object_id="neopool_ph_target",
         )
 
@@ -306,7 +218,7 @@ class TestApplyEntityIdMapping:
         mapping = {"ph_data": "sensor.neopool_ph_target"}
 
         # Should not crash, just log warning
-        await _apply_entity_id_mapping(hass, entry, mapping)
+        _apply_entity_id_mapping(hass, valid_entry, mapping)
 
         # Source entity should remain unchanged
         source = entity_registry.async_get("sensor.neopool_ph_new")
@@ -316,46 +228,18 @@ class TestApplyEntityIdMapping:
 class TestAsyncMigrateMaskedUniqueIds:
     """Tests for async_migrate_masked_unique_ids function."""
 
-    @pytest.mark.asyncio
-    async def test_no_masked_entities_returns_true(self, hass: HomeAssistant) -> None:
+    async def test_no_masked_entities_returns_true(
+        self, hass: HomeAssistant, valid_entry: MockConfigEntry
+    ) -> None:
         """Test returns True when no masked entities exist."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",  # Valid NodeID, not masked
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="ABC123",
-        )
-
-        result = await async_migrate_masked_unique_ids(hass, entry)
+        result = await async_migrate_masked_unique_ids(hass, valid_entry)
 
         assert result is True
 
-    @pytest.mark.asyncio
-    async def test_masked_nodeid_in_config_triggers_migration(self, hass: HomeAssistant) -> None:
+    async def test_masked_nodeid_in_config_triggers_migration(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test masked NodeID in config entry triggers migration."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "XXXX XXXX XXXX XXXX XXXX 3435",  # Masked NodeID
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="XXXX XXXX XXXX XXXX XXXX 3435",
-        )
-
         with (
             patch(
                 "custom_components.sugar_valley_neopool.async_set_setoption157",
@@ -367,38 +251,23 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value="REALNODEID123",
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         assert result is True
         # Config entry should be updated with real NodeID
-        assert entry.data[CONF_NODEID] == "REALNODEID123"
+        assert masked_entry.data[CONF_NODEID] == "REALNODEID123"
 
-    @pytest.mark.asyncio
-    async def test_masked_entity_unique_ids_migrated(self, hass: HomeAssistant) -> None:
+    async def test_masked_entity_unique_ids_migrated(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test entities with masked unique_ids are migrated."""
-        masked_nodeid = "XXXX XXXX XXXX XXXX XXXX 3435"
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: masked_nodeid,
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid=masked_nodeid,
-        )
-
         # Create entity with masked unique_id
         entity_registry = er.async_get(hass)
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
-            unique_id=f"neopool_mqtt_{masked_nodeid}_ph_data",
-            config_entry=entry,
+            unique_id=f"neopool_mqtt_{_MASKED_NODEID}_ph_data",
+            config_entry=masked_entry,
             suggested_object_id="neopool_ph",
         )
 
@@ -413,7 +282,7 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value="REAL123",
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         assert result is True
 
@@ -423,24 +292,10 @@ class TestAsyncMigrateMaskedUniqueIds:
         assert "REAL123" in updated_entity.unique_id
         assert "XXXX" not in updated_entity.unique_id
 
-    @pytest.mark.asyncio
-    async def test_setoption157_set_is_called(self, hass: HomeAssistant) -> None:
+    async def test_setoption157_set_is_called(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test SetOption157 set command is sent during migration."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "XXXX XXXX XXXX XXXX XXXX 3435",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="XXXX XXXX XXXX XXXX XXXX 3435",
-        )
-
         with (
             patch(
                 "custom_components.sugar_valley_neopool.async_set_setoption157",
@@ -452,29 +307,15 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value="REALNODEID",
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         assert result is True
         mock_set.assert_called_once_with(hass, "SmartPool", enable=True)
 
-    @pytest.mark.asyncio
-    async def test_wait_for_nodeid_fails_returns_false(self, hass: HomeAssistant) -> None:
+    async def test_wait_for_nodeid_fails_returns_false(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test returns False when waiting for NodeID fails."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "XXXX XXXX XXXX XXXX XXXX 3435",
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid="XXXX XXXX XXXX XXXX XXXX 3435",
-        )
-
         with (
             patch(
                 "custom_components.sugar_valley_neopool.async_set_setoption157",
@@ -486,37 +327,22 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value=None,  # Failed to get NodeID
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         assert result is False
 
-    @pytest.mark.asyncio
-    async def test_entity_migration_with_existing_unique_id(self, hass: HomeAssistant) -> None:
+    async def test_entity_migration_with_existing_unique_id(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test entity migration skips when new unique_id already exists."""
-        masked_nodeid = "XXXX XXXX XXXX XXXX XXXX 3435"
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: masked_nodeid,
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid=masked_nodeid,
-        )
-
         entity_registry = er.async_get(hass)
 
         # Create entity with masked unique_id
         entity_registry.async_get_or_create(
             domain="sensor",
             platform=DOMAIN,
-            unique_id=f"neopool_mqtt_{masked_nodeid}_ph_data",
-            config_entry=entry,
+            unique_id=f"neopool_mqtt_{_MASKED_NODEID}_ph_data",
+            config_entry=masked_entry,
             suggested_object_id="neopool_ph_masked",
         )
 
@@ -525,7 +351,7 @@ class TestAsyncMigrateMaskedUniqueIds:
             domain="sensor",
             platform=DOMAIN,
             unique_id="neopool_mqtt_REAL123_ph_data",
-            config_entry=entry,
+            config_entry=masked_entry,
             suggested_object_id="neopool_ph_real",
         )
 
@@ -540,7 +366,7 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value="REAL123",
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         # Should still return True (migration completed)
         assert result is True
@@ -550,30 +376,15 @@ class TestAsyncMigrateMaskedUniqueIds:
         assert masked_entity is not None
         assert "XXXX" in masked_entity.unique_id
 
-    @pytest.mark.asyncio
-    async def test_device_registry_updated_with_real_nodeid(self, hass: HomeAssistant) -> None:
+    async def test_device_registry_updated_with_real_nodeid(
+        self, hass: HomeAssistant, masked_entry: MockConfigEntry
+    ) -> None:
         """Test device registry identifier is updated with real NodeID."""
-        masked_nodeid = "XXXX XXXX XXXX XXXX XXXX 3435"
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: masked_nodeid,
-            },
-        )
-        entry.add_to_hass(hass)
-        entry.runtime_data = NeoPoolData(
-            device_name="Test Pool",
-            mqtt_topic="SmartPool",
-            nodeid=masked_nodeid,
-        )
-
         # Register device with masked NodeID
         device_registry = dr.async_get(hass)
         device_registry.async_get_or_create(
-            config_entry_id=entry.entry_id,
-            identifiers={(DOMAIN, masked_nodeid)},
+            config_entry_id=masked_entry.entry_id,
+            identifiers={(DOMAIN, _MASKED_NODEID)},
             manufacturer="Sugar Valley",
             name="Test Pool",
         )
@@ -589,7 +400,7 @@ class TestAsyncMigrateMaskedUniqueIds:
                 return_value="REALNODEID123",
             ),
         ):
-            result = await async_migrate_masked_unique_ids(hass, entry)
+            result = await async_migrate_masked_unique_ids(hass, masked_entry)
 
         assert result is True
 
@@ -601,7 +412,6 @@ class TestAsyncMigrateMaskedUniqueIds:
 class TestWaitForRealNodeid:
     """Tests for _wait_for_real_nodeid function."""
 
-    @pytest.mark.asyncio
     async def test_receives_valid_nodeid(self, hass: HomeAssistant) -> None:
         """Test receiving valid NodeID from telemetry."""
         received_callback = None
@@ -615,7 +425,7 @@ class TestWaitForRealNodeid:
             patch(
                 "homeassistant.components.mqtt.async_subscribe",
                 side_effect=mock_subscribe,
-            ),
+            ) as mock_sub,
             patch("homeassistant.components.mqtt.async_publish"),
         ):
             # Start the wait in a task
@@ -627,16 +437,48 @@ class TestWaitForRealNodeid:
             # Simulate receiving telemetry with valid NodeID
             if received_callback:
                 mock_msg = MagicMock()
-                mock_msg.payload = json.dumps(
-                    {"NeoPool": {"Powerunit": {"NodeID": "4C7525BFB344"}}}
-                )
+                mock_msg.payload = b'{"NeoPool": {"Powerunit": {"NodeID": "4C7525BFB344"}}}'
                 received_callback(mock_msg)
 
             result = await task
 
         assert result == "4C7525BFB344"
+        # Raw bytes are requested so the NodeID check can run before decoding
+        assert mock_sub.call_args.kwargs["encoding"] is None
+
+    async def test_later_nodeid_ignored_once_captured(self, hass: HomeAssistant) -> None:
+        """Test messages arriving after the NodeID is captured do not overwrite it."""
+        received_callback = None
+
+        async def mock_subscribe(hass, topic, callback, **kwargs):
+            nonlocal received_callback
+            received_callback = callback
+            return MagicMock()
+
+        with (
+            patch(
+                "homeassistant.components.mqtt.async_subscribe",
+                side_effect=mock_subscribe,
+            ),
+            patch("homeassistant.components.mqtt.async_publish"),
+        ):
+            task = asyncio.create_task(_wait_for_real_nodeid(hass, "SmartPool", wait_timeout=5.0))
+
+            await asyncio.sleep(0.1)
+
+            # Both messages are delivered before the waiting task resumes
+            if received_callback:
+                first_msg = MagicMock()
+                first_msg.payload = b'{"NeoPool": {"Powerunit": {"NodeID": "4C7525BFB344"}}}'
+                received_callback(first_msg)
+                second_msg = MagicMock()
+                second_msg.payload = b'{"NeoPool": {"Powerunit": {"NodeID": "AABBCCDDEEFF"}}}'
+                received_callback(second_msg)
+
+            result = await task
+
+        assert result == "4C7525BFB344"
 
-    @pytest.mark.asyncio
     async def test_timeout_returns_none(self, hass: HomeAssistant) -> None:
         """Test timeout returns None."""
 
@@ -654,7 +496,37 @@ class TestWaitForRealNodeid:
 
         assert result is None
 
-    @pytest.mark.asyncio
+    async def test_payload_without_nodeid_not_parsed(self, hass: HomeAssistant) -> None:
+        """Test telemetry without a NodeID is skipped before JSON parsing."""
+        received_callback = None
+
+        async def mock_subscribe(hass, topic, callback, **kwargs):
+            nonlocal received_callback
+            received_callback = callback
+            return MagicMock()
+
+        with (
+            patch(
+                "homeassistant.components.mqtt.async_subscribe",
+                side_effect=mock_subscribe,
+            ),
+            patch("homeassistant.components.mqtt.async_publish"),
+        ):
+            task = asyncio.create_task(_wait_for_real_nodeid(hass, "SmartPool", wait_timeout=0.5))
+
+            await asyncio.sleep(0.1)
+
+            if received_callback:
+                mock_msg = MagicMock()
+                mock_msg.payload = b'{"NeoPool": {"Temperature": 25.5}}'
+                with patch.object(json, "loads") as mock_loads:
+                    received_callback(mock_msg)
+                mock_loads.assert_not_called()
+
+            result = await task
+
+        assert result is None
+
     async def test_invalid_json_ignored(self, hass: HomeAssistant) -> None:
         """Test invalid JSON payload is ignored."""
         received_callback = None
@@ -675,10 +547,10 @@ class TestWaitForRealNodeid:
 
             await asyncio.sleep(0.1)
 
-            # Send invalid JSON - should be ignored
+            # Send truncated JSON that passes the NodeID pre-filter - should be ignored
             if received_callback:
                 mock_msg = MagicMock()
-                mock_msg.payload = "not valid json"
+                mock_msg.payload = b'{"NodeID": '
                 received_callback(mock_msg)
 
             result = await task
@@ -686,7 +558,6 @@ class TestWaitForRealNodeid:
         # Should timeout since invalid JSON was ignored
         assert result is None
 
-    @pytest.mark.asyncio
     async def test_bytes_payload_decoded(self, hass: HomeAssistant) -> None:
         """Test bytes payload is decoded correctly."""
         received_callback = None
@@ -717,7 +588,6 @@ class TestWaitForRealNodeid:
 
         assert result == "BYTESNODEID"
 
-    @pytest.mark.asyncio
     async def test_invalid_nodeid_ignored(self, hass: HomeAssistant) -> None:
         """Test invalid NodeID (hidden) is ignored."""
         received_callback = None
@@ -741,7 +611,7 @@ class TestWaitForRealNodeid:
             # Send "hidden" NodeID - should be ignored
             if received_callback:
                 mock_msg = MagicMock()
-                mock_msg.payload = json.dumps({"NeoPool": {"Powerunit": {"NodeID": "hidden"}}})
+                mock_msg.payload = b'{"NeoPool": {"Powerunit": {"NodeID": "hidden"}}}'
                 received_callback(mock_msg)
 
             result = await task
@@ -753,46 +623,17 @@ class TestWaitForRealNodeid:
 class TestSetupEntryWithEntityIdMapping:
     """Tests for async_setup_entry with entity_id_mapping."""
 
-    @pytest.mark.asyncio
-    async def test_setup_applies_entity_id_mapping(self, hass: HomeAssistant) -> None:
+    async def test_setup_applies_entity_id_mapping(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test setup applies entity_id_mapping from config data."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-                "entity_id_mapping": {"ph_data": "sensor.yaml_ph"},
-            },
+        entry = make_entry(
+            data={**SAMPLE_ENTRY_DATA, "entity_id_mapping": {"ph_data": "sensor.yaml_ph"}}
         )
-        entry.add_to_hass(hass)
 
-        with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._apply_entity_id_mapping",
-                new_callable=AsyncMock,
-            ) as mock_apply,
-        ):
+        with patch(
+            "custom_components.sugar_valley_neopool._apply_entity_id_mapping",
+        ) as mock_apply:
             result = await async_setup_entry(hass, entry)
 
         assert result is True
@@ -801,42 +642,14 @@ class TestSetupEntryWithEntityIdMapping:
         call_args = mock_apply.call_args
         assert call_args[0][2] == {"ph_data": "sensor.yaml_ph"}
 
-    @pytest.mark.asyncio
-    async def test_setup_handles_migration_failure(self, hass: HomeAssistant) -> None:
+    async def test_setup_handles_migration_failure(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test setup continues even if masked unique_id migration fails."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry()
+        setup_patches.migrate_unique_ids.return_value = False  # Migration failed
 
-        with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=False,  # Migration failed
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-        ):
-            result = await async_setup_entry(hass, entry)
+        result = await async_setup_entry(hass, entry)
 
         # Setup should still succeed
         assert result is True
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+from types import SimpleNamespace
+from typing import Any
 from unittest.mock import AsyncMock, patch
 
 import pytest
-from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.sugar_valley_neopool import (
     CONFIG_ENTRY_VERSION,
@@ -19,70 +20,46 @@ from custom_components.sugar_valley_neopool.const import (
     CONF_DEVICE_NAME,
     CONF_DISCOVERY_PREFIX,
     CONF_NODEID,
-    DOMAIN,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 
+from .conftest import SAMPLE_ENTRY_DATA, MakeEntry
+
+# Entry data for a second, non-default device
+_MY_POOL_DATA: dict[str, str] = {
+    CONF_DEVICE_NAME: "My Pool",
+    CONF_DISCOVERY_PREFIX: "MyPool",
+    CONF_NODEID: "XYZ789",
+}
+
+
+# Required NeoPoolData fields shared by the dataclass tests
+_BASE_DATA: dict[str, str] = {"device_name": "Pool", "mqtt_topic": "Topic", "nodeid": "123"}
+
 
 class TestAsyncSetupEntryExtended:
     """Extended tests for async_setup_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_registers_device(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_registers_device(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test setup entry registers device."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "My Pool",
-                CONF_DISCOVERY_PREFIX: "MyPool",
-                CONF_NODEID: "XYZ789",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry(data=_MY_POOL_DATA.copy())
 
-        with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_register_device",
-                new_callable=AsyncMock,
-            ) as mock_register,
-        ):
+        with patch(
+            "custom_components.sugar_valley_neopool.async_register_device",
+            new_callable=AsyncMock,
+        ) as mock_register:
             await async_setup_entry(hass, entry)
 
         mock_register.assert_called_once_with(hass, entry)
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_mqtt_timeout(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_mqtt_timeout(
+        self, hass: HomeAssistant, make_entry: MakeEntry
+    ) -> None:
         """Test setup entry raises when MQTT times out."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry()
 
         with (
             patch(
@@ -93,42 +70,18 @@ class TestAsyncSetupEntryExtended:
         ):
             await async_setup_entry(hass, entry)
 
-    @pytest.mark.asyncio
-    async def test_setup_entry_with_entity_id_mapping(self, hass: HomeAssistant) -> None:
+    async def test_setup_entry_with_entity_id_mapping(
+        self, hass: HomeAssistant, make_entry: MakeEntry, setup_patches: SimpleNamespace
+    ) -> None:
         """Test setup with entity_id_mapping applies mapping."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
+        entry = make_entry(
             data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
+                **SAMPLE_ENTRY_DATA,
                 "entity_id_mapping": {"water_temp": "sensor.neopool_water_temp"},
-            },
-            options={},
+            }
         )
-        entry.add_to_hass(hass)
 
         with (
-            patch(
-                "homeassistant.components.mqtt.async_wait_for_mqtt_client",
-                return_value=True,
-            ),
-            patch.object(hass.config_entries, "async_forward_entry_setups", return_value=True),
-            patch(
-                "custom_components.sugar_valley_neopool.async_fetch_device_metadata",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool.async_migrate_masked_unique_ids",
-                new_callable=AsyncMock,
-                return_value=True,
-            ),
-            patch(
-                "custom_components.sugar_valley_neopool._setup_setoption157_enforcement",
-                new_callable=AsyncMock,
-                return_value=None,
-            ),
             patch(
                 "custom_components.sugar_valley_neopool.async_register_device",
                 new_callable=AsyncMock,
@@ -146,18 +99,11 @@ class TestAsyncSetupEntryExtended:
 class TestAsyncUnloadEntryExtended:
     """Extended tests for async_unload_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_unload_clears_runtime_data(self, hass: HomeAssistant) -> None:
+    async def test_unload_clears_runtime_data(
+        self, hass: HomeAssistant, make_entry: MakeEntry
+    ) -> None:
         """Test unload clears runtime data properly."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "Test Pool",
-                CONF_DISCOVERY_PREFIX: "SmartPool",
-                CONF_NODEID: "ABC123",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry()
         entry.runtime_data = NeoPoolData(
             device_name="Test Pool",
             mqtt_topic="SmartPool",
@@ -174,61 +120,33 @@ class TestAsyncUnloadEntryExtended:
 class TestAsyncMigrateEntryExtended:
     """Extended tests for async_migrate_entry function."""
 
-    @pytest.mark.asyncio
-    async def test_migrate_already_current_version(self, hass: HomeAssistant) -> None:
-        """Test migration when already at current version."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=CONFIG_ENTRY_VERSION,
-            data={CONF_DEVICE_NAME: "Pool"},
-            options={"some_option": "value"},
+    @pytest.mark.parametrize(
+        "version", [CONFIG_ENTRY_VERSION, 1], ids=["already_current", "from_version_1"]
+    )
+    async def test_migrate_preserves_data(
+        self, hass: HomeAssistant, make_entry: MakeEntry, version: int
+    ) -> None:
+        """Test migration ends at the current version and keeps existing data and options."""
+        entry = make_entry(
+            version=version, data=_MY_POOL_DATA.copy(), options={"some_option": "value"}
         )
-        entry.add_to_hass(hass)
 
         result = await async_migrate_entry(hass, entry)
 
-        # Should return True and not modify anything
         assert result is True
         assert entry.version == CONFIG_ENTRY_VERSION
-
-    @pytest.mark.asyncio
-    async def test_migrate_preserves_data(self, hass: HomeAssistant) -> None:
-        """Test migration preserves entry data."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            version=1,
-            data={
-                CONF_DEVICE_NAME: "My Pool",
-                CONF_DISCOVERY_PREFIX: "CustomTopic",
-                CONF_NODEID: "CUSTOM123",
-            },
-            options={},
-        )
-        entry.add_to_hass(hass)
-
-        await async_migrate_entry(hass, entry)
-
-        # Data should be preserved
-        assert entry.data[CONF_DEVICE_NAME] == "My Pool"
-        assert entry.data[CONF_DISCOVERY_PREFIX] == "CustomTopic"
-        assert entry.data[CONF_NODEID] == "CUSTOM123"
+        assert entry.data == _MY_POOL_DATA
+        assert entry.options["some_option"] == "value"
 
 
 class TestAsyncRegisterDeviceExtended:
     """Extended tests for async_register_device."""
 
-    @pytest.mark.asyncio
-    async def test_register_device_stores_device_id(self, hass: HomeAssistant) -> None:
+    async def test_register_device_stores_device_id(
+        self, hass: HomeAssistant, make_entry: MakeEntry
+    ) -> None:
         """Test that device registration stores device_id in runtime_data."""
-        entry = MockConfigEntry(
-            domain=DOMAIN,
-            data={
-                CONF_DEVICE_NAME: "My Pool",
-                CONF_DISCOVERY_PREFIX: "MyPool",
-                CONF_NODEID: "XYZ789",
-            },
-        )
-        entry.add_to_hass(hass)
+        entry = make_entry(data=_MY_POOL_DATA.copy())
         entry.runtime_data = NeoPoolData(
             device_name="My Pool",
             mqtt_topic="MyPool",
@@ -244,31 +162,37 @@ class TestAsyncRegisterDeviceExtended:
 class TestNeoPoolDataExtended:
     """Extended tests for NeoPoolData dataclass."""
 
-    def test_neopool_data_with_all_fields(self) -> None:
-        """Test NeoPoolData with all fields populated."""
-        data = NeoPoolData(
-            device_name="Full Pool",
-            mqtt_topic="FullTopic",
-            nodeid="FULL123",
-            sensor_data={"temp": 30.0, "ph": 7.2},
-            available=True,
-            device_id="device_123",
-        )
+    @pytest.mark.parametrize(
+        ("extra", "expected"),
+        [
+            (
+                {
+                    "sensor_data": {"temp": 30.0, "ph": 7.2},
+                    "available": True,
+                    "device_id": "device_123",
+                    "entity_id_mapping": {"water_temp": "neopool_water_temp"},
+                },
+                {
+                    "sensor_data": {"temp": 30.0, "ph": 7.2},
+                    "available": True,
+                    "device_id": "device_123",
+                    "entity_id_mapping": {"water_temp": "neopool_water_temp"},
+                },
+            ),
+            ({}, {"available": False, "device_id": None, "entity_id_mapping": {}}),
+        ],
+        ids=["all_fields", "default_values"],
+    )
+    def test_neopool_data_fields(self, extra: dict[str, Any], expected: dict[str, Any]) -> None:
+        """Test NeoPoolData stores explicit values and applies defaults."""
+        data = NeoPoolData(**_BASE_DATA, **extra)
 
-        assert data.device_name == "Full Pool"
-        assert data.mqtt_topic == "FullTopic"
-        assert data.nodeid == "FULL123"
-        assert data.sensor_data == {"temp": 30.0, "ph": 7.2}
-        assert data.available is True
-        assert data.device_id == "device_123"
+        fields = {**_BASE_DATA, **expected}
+        assert {name: getattr(data, name) for name in fields} == fields
 
     def test_neopool_data_mutable_sensor_data(self) -> None:
         """Test NeoPoolData sensor_data is mutable."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-        )
+        data = NeoPoolData(**_BASE_DATA)
 
         # Should be able to modify sensor_data
         data.sensor_data["new_key"] = "new_value"
@@ -276,36 +200,10 @@ class TestNeoPoolDataExtended:
 
     def test_neopool_data_availability_toggle(self) -> None:
         """Test NeoPoolData availability can be toggled."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-            available=False,
-        )
+        data = NeoPoolData(**_BASE_DATA, available=False)
 
         assert data.available is False
 
         # Should be able to update availability
         data.available = True
         assert data.available is True
-
-    def test_neopool_data_entity_id_mapping(self) -> None:
-        """Test NeoPoolData entity_id_mapping field."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-            entity_id_mapping={"water_temp": "neopool_water_temp"},
-        )
-
-        assert data.entity_id_mapping == {"water_temp": "neopool_water_temp"}
-
-    def test_neopool_data_entity_id_mapping_default_empty(self) -> None:
-        """Test NeoPoolData entity_id_mapping defaults to empty dict."""
-        data = NeoPoolData(
-            device_name="Pool",
-            mqtt_topic="Topic",
-            nodeid="123",
-        )
-
-        assert data.entity_id_mapping == {}